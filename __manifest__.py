@@ -1,6 +1,6 @@
 {
     'name': 'Open HRMS Custody',
-    'version': '18.0.1.0.1',
+    'version': '18.0.1.0.2',
     'category': 'Human Resources',
     'summary': """Manage the company properties""",
     'description': 'Manage the company properties when it is in '
@@ -24,6 +24,7 @@
         'wizard/property_return_date_views.xml',
         'wizard/multi_images_upload_views.xml',
         'wizard/record_maintenance_views.xml',
+        'wizard/bulk_maintenance_views.xml',
         # Main views with menu structure - must come before dependent views
         'views/custody_property_views.xml',
         'views/custody_image_views.xml',
@@ -34,10 +35,14 @@
         'views/custody_tag_views.xml',
         # Employee views
         'views/hr_employee_views.xml',
+        'views/res_config_settings_views.xml',
+        'wizard/compute_audit_views.xml',
         # Device Inspection views - temporarily disabled
         # 'views/device_inspection_views.xml',
         # Reports last
         'reports/report_custody_views.xml',
+        'reports/maintenance_forecast_views.xml',
+        'reports/report_maintenance_cost_views.xml',
     ],
     'demo': ['data/demo_data.xml'],
     'images': ['static/description/banner.jpg'],
@@ -0,0 +1,33 @@
+# migrations/18.0.1.0.2/post-migration.py
+import json
+
+from odoo import SUPERUSER_ID, api
+
+# Custodies returned by the pre-migration
+CONFLICT_PARAMETER = 'hr_custody.migration_18_0_1_0_2_returned_ids'
+
+
+def migrate(cr, version):
+    """Flag the custodies returned by the pre-migration for review.
+
+    Each one gets a note in its chatter and a to-do activity for the user
+    who approved it, so an officer can check the employee and property
+    history.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    parameter = env['ir.config_parameter'].search([('key', '=', CONFLICT_PARAMETER)])
+    if not parameter:
+        return
+    custodies = env['hr.custody'].browse(json.loads(parameter.value)).exists()
+    note = ("Returned automatically during the module upgrade: the property was "
+            "also approved to a more recent custody. Please review this custody.")
+    custodies._message_log_batch(bodies={custody.id: note for custody in custodies})
+    admin = env.ref('base.user_admin', raise_if_not_found=False)
+    for custody in custodies:
+        custody.activity_schedule(
+            'mail.mail_activity_data_todo',
+            summary='Review custody returned by the upgrade',
+            note=note,
+            user_id=(custody.approved_by_id or admin or env.user).id,
+        )
+    parameter.unlink()
@@ -0,0 +1,53 @@
+# migrations/18.0.1.0.2/pre-migration.py
+import json
+import logging
+
+from odoo.tools.sql import column_exists, create_column
+
+_logger = logging.getLogger(__name__)
+
+# Custodies returned by this migration, picked up by the post-migration
+CONFLICT_PARAMETER = 'hr_custody.migration_18_0_1_0_2_returned_ids'
+
+
+def migrate(cr, version):
+    """Resolve the properties approved to several custodies at once.
+
+    The ``single_approved_property`` exclusion constraint can't be added
+    while such rows exist. For each property, the most recently approved
+    custody is kept and the older ones are returned as of now. Their ids
+    are stored for the post-migration, which logs a note and schedules a
+    review activity on each of them.
+    """
+    if not column_exists(cr, 'hr_custody', 'returned_date'):
+        create_column(cr, 'hr_custody', 'returned_date', 'timestamp')
+    cr.execute("""
+        WITH ranked AS (
+            SELECT id, custody_property_id,
+                   row_number() OVER (
+                       PARTITION BY custody_property_id
+                       ORDER BY approved_date DESC NULLS LAST, id DESC
+                   ) AS rank
+              FROM hr_custody
+             WHERE state = 'approved' AND custody_property_id IS NOT NULL
+        )
+        UPDATE hr_custody
+           SET state = 'returned',
+               returned_date = now() AT TIME ZONE 'UTC'
+          FROM ranked
+         WHERE hr_custody.id = ranked.id AND ranked.rank > 1
+     RETURNING hr_custody.id, ranked.custody_property_id
+    """)
+    returned = cr.fetchall()
+    for custody_id, property_id in returned:
+        _logger.warning(
+            "Custody %s was approved for property %s together with a more recent "
+            "custody; marked as returned to allow a single approved custody per property.",
+            custody_id, property_id,
+        )
+    if returned:
+        cr.execute("""
+            INSERT INTO ir_config_parameter (key, value, create_uid, write_uid, create_date, write_date)
+            VALUES (%s, %s, 1, 1, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC')
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+        """, [CONFLICT_PARAMETER, json.dumps([custody_id for custody_id, __ in returned])])
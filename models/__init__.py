@@ -5,6 +5,7 @@ from . import hr_custody
 from . import hr_employee
 from . import custody_image
 from . import maintenance_history
+from . import res_config_settings
 # Temporarily disabled to resolve loading issues
 # from . import device_inspection_type
 # from . import device_inspection
@@ -155,6 +155,19 @@ class CustodyCategory(models.Model):
         default=True,
         help='Also use approvers from parent category'
     )
+
+    # Approvers resolved through the parent chain, kept up to date by the ORM
+    effective_approver_ids = fields.Many2many(
+        'res.users',
+        'custody_category_effective_approver_rel',
+        'category_id',
+        'user_id',
+        string='Effective Approvers',
+        compute='_compute_effective_approver_ids',
+        store=True,
+        recursive=True,
+        help='Default approvers of this category including the inherited ones'
+    )
     
     # Extended property count to include subcategories
     total_property_count = fields.Integer(
@@ -172,6 +185,15 @@ class CustodyCategory(models.Model):
             else:
                 category.complete_name = category.name
     
+    @api.depends('approver_ids', 'inherit_parent_approvers', 'parent_id.effective_approver_ids')
+    def _compute_effective_approver_ids(self):
+        """Resolve the approvers of each category, including inherited ones"""
+        for category in self:
+            approvers = category.approver_ids
+            if category.inherit_parent_approvers and category.parent_id:
+                approvers |= category.parent_id.effective_approver_ids
+            category.effective_approver_ids = approvers
+
     @api.depends('property_ids')
     def _compute_property_count(self):
         """Compute the number of properties in each category"""
@@ -256,18 +278,8 @@ class CustodyCategory(models.Model):
         # Create a combined text for searching
         text = f"{property_name} {description}"
         
-        # Get category keywords from system parameter or use defaults
-        category_keywords = self.env['ir.config_parameter'].get_param(
-            'hr_custody.category_keywords'
-        )
-        if category_keywords:
-            try:
-                import json
-                category_keywords = json.loads(category_keywords)
-            except (ValueError, json.JSONDecodeError):
-                category_keywords = DEFAULT_CATEGORY_KEYWORDS
-        else:
-            category_keywords = DEFAULT_CATEGORY_KEYWORDS
+        # Category keywords from the settings, parsed once per registry
+        category_keywords = self.env['res.config.settings']._get_custody_settings()['category_keywords']
         
         # Find matching categories
         matches = {}
@@ -329,12 +341,4 @@ class CustodyCategory(models.Model):
     def get_effective_approvers(self):
         """Get all approvers for this category, including inherited ones"""
         self.ensure_one()
-        
-        approvers = self.approver_ids
-        
-        # Add parent approvers if needed
-        if self.inherit_parent_approvers and self.parent_id:
-            parent_approvers = self.parent_id.get_effective_approvers()
-            approvers |= parent_approvers
-            
-        return approvers 
\ No newline at end of file
+        return self.effective_approver_ids
@@ -1,14 +1,173 @@
 import base64
-from io import BytesIO
+import hashlib
+import io
+import logging
+from contextlib import contextmanager
+
+import psycopg2
+
+from odoo import api, fields, models, _
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.image import image_process
+from odoo.tools.sql import create_index
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 try:
-    import PIL
     from PIL import Image
 except ImportError:
-    PIL = None
+    Image = None
+
+_logger = logging.getLogger(__name__)
+
+IMAGE_PROCESSING_BATCH_SIZE = 50
+# Size of the normalized image and of its thumbnail variants
+IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_VARIANT_SIZES = {
+    'image_512': (512, 512),
+    'image_128': (128, 128),
+}
+# Unique index rejecting the same file twice for a custody and image type
+CHECKSUM_INDEX = 'custody_image_custody_checksum_index'
+# Perceptual hashes differing by at most this many bits are near-duplicates
+PERCEPTUAL_HASH_MAX_DISTANCE = 6
+# Side of the grayscale squares compared by the damage analysis, and of the
+# blocks their structural similarity is measured on
+DAMAGE_COMPARISON_SIZE = 256
+DAMAGE_BLOCK_SIZE = 8
+# Percentile of the block differences reported as the damage score
+DAMAGE_SCORE_PERCENTILE = 99
+# Image fields whose change invalidates the damage analysis of the custody
+DAMAGE_ANALYSIS_FIELDS = {'image', 'image_type', 'custody_id'}
+# SSIM stabilizing constants for intensities in [0, 1]
+SSIM_C1 = 0.01 ** 2
+SSIM_C2 = 0.03 ** 2
+
+
+def process_image_data(source):
+    """Normalize the raw image ``source`` and render its thumbnail variants.
+
+    Pure function of the image bytes, so it can run in a process pool.
+
+    :return: tuple ``(images, perceptual_hash)``: dict of raw image bytes
+        per field name, where ``image`` is only set when the normalized
+        image differs from ``source``, and the perceptual hash of the image
+    """
+    normalized = image_process(source, size=IMAGE_MAX_SIZE)
+    images = {fname: image_process(normalized, size=size)
+              for fname, size in IMAGE_VARIANT_SIZES.items()}
+    if normalized != source:
+        images['image'] = normalized
+    return images, compute_perceptual_hash(normalized)
+
+
+def compute_checksum(source):
+    """SHA-1 of the raw image ``source``, like attachment checksums"""
+    return hashlib.sha1(source).hexdigest()
+
+
+def compute_perceptual_hash(source):
+    """64-bit difference hash of the raw image ``source``.
+
+    The image is reduced to 9x8 grayscale pixels and each bit tells whether
+    a pixel is brighter than its right neighbour, so resized or re-encoded
+    copies of a photo only differ by a few bits.
+
+    :return: hexadecimal hash, or False when the image can't be decoded
+    """
+    if Image is None:
+        return False
+    try:
+        img = Image.open(io.BytesIO(source))
+        # Let the JPEG decoder downscale instead of decoding the full image
+        img.draft('L', (64, 64))
+        pixels = list(img.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    except (OSError, ValueError):
+        return False
+    bits = 0
+    for row in range(8):
+        for col in range(row * 9, row * 9 + 8):
+            bits = (bits << 1) | (pixels[col] > pixels[col + 1])
+    return '%016x' % bits
 
-from odoo import api, fields, models, _
-from odoo.exceptions import ValidationError
+
+def perceptual_distance(hash1, hash2):
+    """Number of differing bits between two perceptual hashes"""
+    return (int(hash1, 16) ^ int(hash2, 16)).bit_count()
+
+
+def _load_comparison_array(source):
+    """Grayscale DAMAGE_COMPARISON_SIZE square of ``source`` as floats in [0, 1]"""
+    size = (DAMAGE_COMPARISON_SIZE, DAMAGE_COMPARISON_SIZE)
+    img = Image.open(io.BytesIO(source))
+    img.draft('L', size)
+    return np.asarray(img.convert('L').resize(size, Image.LANCZOS), dtype=np.float64) / 255.0
+
+
+def _block_statistics(arrays):
+    """Block means, variances and centered pixels of a stack of images.
+
+    :return: tuple of arrays shaped (images, rows, cols) for the means and
+        variances and (images, rows, cols, pixels) for the centered pixels
+    """
+    blocks = DAMAGE_COMPARISON_SIZE // DAMAGE_BLOCK_SIZE
+    pixels = np.stack(arrays).reshape(
+        len(arrays), blocks, DAMAGE_BLOCK_SIZE, blocks, DAMAGE_BLOCK_SIZE,
+    ).transpose(0, 1, 3, 2, 4).reshape(len(arrays), blocks, blocks, -1)
+    means = pixels.mean(axis=-1)
+    centered = pixels - means[..., None]
+    return means, (centered ** 2).mean(axis=-1), centered
+
+
+def _render_heatmap(array, difference):
+    """PNG of the grayscale ``array`` with the block ``difference`` in red"""
+    mask = difference.repeat(DAMAGE_BLOCK_SIZE, axis=0).repeat(DAMAGE_BLOCK_SIZE, axis=1)
+    gray = array * 255.0
+    rgb = np.stack([gray + mask * (255.0 - gray), gray * (1 - mask), gray * (1 - mask)], axis=-1)
+    output = io.BytesIO()
+    Image.fromarray(rgb.round().astype(np.uint8), 'RGB').save(output, format='PNG')
+    return output.getvalue()
+
+
+def compare_image_sets(checkout_sources, return_sources):
+    """Compare the return photos of a custody with its checkout photos.
+
+    Photos are reduced to grayscale squares and compared with a block-wise
+    structural similarity (SSIM), computed with NumPy for every
+    checkout/return pair at once. Each return photo is matched with its most
+    similar checkout photo, the blocks where the pair differs the most point
+    at likely damage.
+
+    :return: tuple ``(similarity, damage_score, heatmap)``: the mean SSIM of
+        the matched pairs in [0, 1], the DAMAGE_SCORE_PERCENTILE of the block
+        differences of the worst pair in [0, 100] and a PNG of the worst
+        return photo with the differing blocks highlighted
+    """
+    checkout = [_load_comparison_array(source) for source in checkout_sources]
+    returned = [_load_comparison_array(source) for source in return_sources]
+    mean_c, var_c, centered_c = _block_statistics(checkout)
+    mean_r, var_r, centered_r = _block_statistics(returned)
+
+    # SSIM of every block, shaped (checkout, return, rows, cols)
+    covariance = np.einsum('cijk,rijk->crij', centered_c, centered_r) / centered_c.shape[-1]
+    mean_c, var_c = mean_c[:, None], var_c[:, None]
+    mean_r, var_r = mean_r[None], var_r[None]
+    ssim = ((2 * mean_c * mean_r + SSIM_C1) * (2 * covariance + SSIM_C2)) / (
+        (mean_c ** 2 + mean_r ** 2 + SSIM_C1) * (var_c + var_r + SSIM_C2))
+
+    returned_index = np.arange(len(returned))
+    pair_similarity = ssim.mean(axis=(2, 3))
+    best = pair_similarity.argmax(axis=0)
+    difference = np.clip(1 - ssim[best, returned_index], 0, 1)
+    scores = np.percentile(difference.reshape(len(returned), -1), DAMAGE_SCORE_PERCENTILE, axis=1)
+    worst = scores.argmax()
+
+    similarity = float(np.clip(pair_similarity[best, returned_index].mean(), 0, 1))
+    return similarity, float(scores[worst] * 100), _render_heatmap(returned[worst], difference[worst])
 
 
 class CustodyImage(models.Model):
@@ -28,24 +187,67 @@ class CustodyImage(models.Model):
         help='Determines the order of images'
     )
     
+    # Stored as uploaded, then normalized to IMAGE_MAX_SIZE in background
     image = fields.Image(
         string='Image',
-        max_width=1920,
-        max_height=1920,
         attachment=True,
         required=True,
         help='The image file'
     )
-    
-    # Add thumbnail for better performance
+
+    # Thumbnail variants generated by the image processing job
+    image_512 = fields.Image(
+        string='Preview',
+        attachment=True,
+        readonly=True,
+        help='Medium-sized image used for previews'
+    )
+
     image_128 = fields.Image(
         string='Thumbnail',
-        related='image',
-        max_width=128,
-        max_height=128,
-        store=True,
+        attachment=True,
+        readonly=True,
         help='Small-sized image used for thumbnails'
     )
+
+    processing_state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Processed'),
+        ('failed', 'Failed'),
+    ],
+        string='Processing Status',
+        default='pending',
+        required=True,
+        readonly=True,
+        copy=False,
+        index=True,
+        help='Whether the normalized image and thumbnails have been generated'
+    )
+
+    # Fingerprints of the uploaded image, computed at ingest
+    checksum = fields.Char(
+        string='Checksum',
+        readonly=True,
+        copy=False,
+        help='SHA-1 of the uploaded image, used to reject exact duplicates'
+    )
+
+    perceptual_hash = fields.Char(
+        string='Perceptual Hash',
+        readonly=True,
+        copy=False,
+        help='Difference hash of the uploaded image, used to detect near-duplicates'
+    )
+
+    duplicate_of_id = fields.Many2one(
+        'custody.image',
+        string='Duplicate Of',
+        readonly=True,
+        copy=False,
+        ondelete='set null',
+        index='btree_not_null',
+        help='Earlier image of the same custody this upload nearly matches'
+    )
     
     image_date = fields.Datetime(
         string='Image Date',
@@ -89,34 +291,243 @@ class CustodyImage(models.Model):
     )
     
     
+    def init(self):
+        """Index the fingerprints per custody and image type.
+
+        The checksum index is unique so concurrent uploads of the same file
+        can't both be stored.
+        """
+        self._cr.execute("""
+            SELECT i.indisunique
+              FROM pg_index i
+              JOIN pg_class c ON c.oid = i.indexrelid
+             WHERE c.relname = %s
+        """, [CHECKSUM_INDEX])
+        index = self._cr.fetchone()
+        if index and not index[0]:
+            self._cr.execute(SQL("DROP INDEX %s", SQL.identifier(CHECKSUM_INDEX)))
+        if not index or not index[0]:
+            self._cr.execute(SQL(
+                "CREATE UNIQUE INDEX %s ON %s (custody_id, image_type, checksum) WHERE checksum IS NOT NULL",
+                SQL.identifier(CHECKSUM_INDEX), SQL.identifier(self._table),
+            ))
+        self._cr.execute("DROP INDEX IF EXISTS custody_image_custody_perceptual_hash_index")
+        create_index(
+            self._cr, 'custody_image_custody_type_perceptual_hash_index', self._table,
+            ['custody_id', 'image_type', 'perceptual_hash'],
+            where='perceptual_hash IS NOT NULL',
+        )
+
+    @api.model
+    def _get_checksum(self, image):
+        """Checksum of the base64 ``image`` being stored"""
+        return image and compute_checksum(base64.b64decode(image))
+
+    @api.model
+    def _find_exact_duplicates(self, vals_list, exclude=None):
+        """Images already stored with the checksum of each of ``vals_list``
+        for the same custody and image type.
+
+        :param exclude: custody.image records to ignore, e.g. the ones
+            being written
+        :return: list of custody.image records, empty when the values have
+            no stored duplicate
+        """
+        empty = self.browse()
+        keys = [(vals.get('custody_id'), vals.get('image_type'), vals.get('checksum'))
+                for vals in vals_list]
+        if not any(all(key) for key in keys):
+            return [empty] * len(vals_list)
+        domain = [
+            ('custody_id', 'in', list({key[0] for key in keys if all(key)})),
+            ('checksum', 'in', list({key[2] for key in keys if all(key)})),
+        ]
+        if exclude:
+            domain.append(('id', 'not in', exclude.ids))
+        stored = self.search_fetch(domain, ['custody_id', 'image_type', 'checksum'])
+        by_key = {(image.custody_id.id, image.image_type, image.checksum): image for image in stored}
+        return [by_key.get(key, empty) for key in keys]
+
+    def _link_near_duplicates(self):
+        """Link each image of ``self`` to the closest earlier image of the
+        same custody and image type whose perceptual hash is within
+        PERCEPTUAL_HASH_MAX_DISTANCE bits.
+
+        Return photos are meant to look like checkout photos, so images of
+        different types are never linked.
+        """
+        images = self.filtered(lambda i: i.custody_id and i.perceptual_hash and not i.duplicate_of_id)
+        if not images:
+            return
+        empty = self.browse()
+        stored = self.search_fetch([
+            ('custody_id', 'in', images.custody_id.ids),
+            ('image_type', 'in', list(set(images.mapped('image_type')))),
+            ('perceptual_hash', '!=', False),
+            ('id', '<', max(images.ids)),
+        ], ['custody_id', 'image_type', 'perceptual_hash', 'duplicate_of_id'], order='id')
+        by_key = stored.grouped(lambda image: (image.custody_id, image.image_type))
+        for image in images:
+            distances = [
+                (perceptual_distance(candidate.perceptual_hash, image.perceptual_hash), candidate)
+                for candidate in by_key.get((image.custody_id, image.image_type), empty)
+                if candidate.id < image.id
+            ]
+            distance, match = min(distances, key=lambda d: d[0], default=(None, empty))
+            if match and distance <= PERCEPTUAL_HASH_MAX_DISTANCE:
+                # Link to the original rather than to another duplicate
+                image.duplicate_of_id = match.duplicate_of_id or match
+
+    def _raise_duplicate_image(self, custody_id, image_type):
+        """Reject an upload already stored for the custody and image type"""
+        raise ValidationError(_(
+            "This image was already uploaded as a %(type)s image for custody %(custody)s.",
+            type=dict(self._fields['image_type']._description_selection(self.env)).get(image_type),
+            custody=self.env['hr.custody'].browse(custody_id).display_name,
+        ))
+
+    @contextmanager
+    def _check_unique_checksum(self, vals_list):
+        """Turn a violation of the unique checksum index, raised by concurrent
+        uploads of the same file, into the duplicate image error"""
+        try:
+            with self.env.cr.savepoint():
+                yield
+                self.flush_model(['custody_id', 'image_type', 'checksum'])
+        except psycopg2.errors.UniqueViolation as e:
+            if e.diag.constraint_name != CHECKSUM_INDEX:
+                raise
+            vals = next((vals for vals in vals_list if vals.get('custody_id')), {})
+            self._raise_duplicate_image(vals.get('custody_id'), vals.get('image_type'))
+
     @api.model_create_multi
     def create(self, vals_list):
-        """Override create to optimize images on creation"""
-        # Resize large images to improve performance
-        if PIL:
-            for vals in vals_list:
-                if vals.get('image') and isinstance(vals['image'], str):
-                    try:
-                        image_data = base64.b64decode(vals['image'])
-                        img = Image.open(BytesIO(image_data))
-                        
-                        # Don't process if already reasonable size
-                        if img.width <= 1920 and img.height <= 1920:
-                            continue
-                            
-                        # Resize to max dimensions while preserving aspect ratio
-                        img.thumbnail((1920, 1920), Image.LANCZOS)
-                        
-                        # Convert back to base64
-                        buffer = BytesIO()
-                        img.save(buffer, format=img.format or 'JPEG', quality=85)
-                        vals['image'] = base64.b64encode(buffer.getvalue()).decode()
-                    except Exception:
-                        # If any error occurs, just use the original image
-                        pass
-                        
-        return super().create(vals_list)
-        
+        """Store uploads as-is and queue their processing.
+
+        Only the checksum is computed in the request: an exact copy of an
+        image already stored for the same custody and image type is
+        rejected. Near-duplicates are linked by the processing job.
+        """
+        default_type = self.default_get(['image_type']).get('image_type')
+        vals_list = [
+            dict(vals, checksum=self._get_checksum(vals['image']))
+            if vals.get('image') and 'checksum' not in vals else vals
+            for vals in vals_list
+        ]
+        keyed = [dict(vals, image_type=vals.get('image_type') or default_type) for vals in vals_list]
+        seen = set()
+        for vals, exact in zip(keyed, self._find_exact_duplicates(keyed)):
+            key = (vals.get('custody_id'), vals['image_type'], vals.get('checksum'))
+            if exact or (all(key) and key in seen):
+                self._raise_duplicate_image(vals['custody_id'], vals['image_type'])
+            seen.add(key)
+        with self._check_unique_checksum(keyed):
+            images = super().create(vals_list)
+        images._link_near_duplicates()
+        images._trigger_image_processing()
+        images._queue_damage_analysis()
+        return images
+
+    def write(self, vals):
+        """Queue the processing again when the image is replaced, and the
+        damage analysis of the custodies whose compared images change.
+
+        A replacement image goes through the same duplicate check as an
+        upload, its near-duplicate link being restored by the processing
+        job.
+        """
+        if self.env.context.get('custody_image_processing'):
+            return super().write(vals)
+        if DAMAGE_ANALYSIS_FIELDS.intersection(vals):
+            self._queue_damage_analysis()
+        if 'image' in vals:
+            vals = dict(vals, processing_state='pending', image_512=False, image_128=False,
+                        perceptual_hash=False, duplicate_of_id=False,
+                        checksum=self._get_checksum(vals['image']))
+        if {'checksum', 'custody_id', 'image_type'}.intersection(vals):
+            keyed = [{
+                'custody_id': vals.get('custody_id', image.custody_id.id),
+                'image_type': vals.get('image_type', image.image_type),
+                'checksum': vals.get('checksum', image.checksum),
+            } for image in self]
+            for key, exact in zip(keyed, self._find_exact_duplicates(keyed, exclude=self)):
+                if exact:
+                    self._raise_duplicate_image(key['custody_id'], key['image_type'])
+            with self._check_unique_checksum(keyed):
+                res = super().write(vals)
+        else:
+            res = super().write(vals)
+        if 'image' in vals:
+            self._trigger_image_processing()
+        if DAMAGE_ANALYSIS_FIELDS.intersection(vals):
+            self._queue_damage_analysis()
+        return res
+
+    def unlink(self):
+        """Analyze the custodies again once their compared images are gone"""
+        images = self.filtered(lambda image: image.image_type in ('checkout', 'return'))
+        custodies = images.custody_id
+        res = super().unlink()
+        custodies.sudo().action_analyze_return_images()
+        return res
+
+    def _queue_damage_analysis(self):
+        """Queue the damage analysis of the returned custodies of the
+        checkout and return images of ``self``"""
+        images = self.filtered(lambda image: image.image_type in ('checkout', 'return'))
+        images.custody_id.sudo().action_analyze_return_images()
+
+    def _trigger_image_processing(self):
+        """Wake up the image processing job if an image is pending"""
+        if any(image.processing_state == 'pending' for image in self):
+            self.env.ref('hr_custody.ir_cron_process_custody_images')._trigger()
+
+    def _process_image(self):
+        """Normalize the image of ``self`` and generate its thumbnail variants.
+
+        :return: values to write on the record
+        """
+        self.ensure_one()
+        if not self.image:
+            return dict.fromkeys(IMAGE_VARIANT_SIZES, False)
+        source = base64.b64decode(self.with_context(bin_size=False).image)
+        images, perceptual_hash = process_image_data(source)
+        values = {fname: base64.b64encode(data) for fname, data in images.items()}
+        values['perceptual_hash'] = perceptual_hash
+        return values
+
+    @api.model
+    def _cron_process_images(self, batch_size=IMAGE_PROCESSING_BATCH_SIZE, auto_commit=True):
+        """Process the pending images in batches.
+
+        Each image is normalized, its thumbnails generated and its
+        perceptual hash computed outside of the upload request, then it is
+        linked to the near-duplicate it matches. Images that cannot be
+        decoded are marked as failed so they are not retried forever.
+        """
+        domain = [('processing_state', '=', 'pending')]
+        remaining = self.search_count(domain)
+        while remaining:
+            images = self.search(domain, order='id', limit=batch_size)
+            if not images:
+                break
+            for image in images:
+                try:
+                    values = image._process_image()
+                    values['processing_state'] = 'done'
+                except Exception:
+                    _logger.exception("Failed to process custody image %s", image.id)
+                    values = {'processing_state': 'failed'}
+                image.with_context(custody_image_processing=True).write(values)
+            images._link_near_duplicates()
+            images.invalidate_recordset()
+
+            remaining = max(remaining - len(images), 0)
+            self.env['ir.cron']._notify_progress(done=len(images), remaining=remaining)
+            if auto_commit:
+                self.env.cr.commit()
+        return True
+
     def action_view_fullscreen(self):
         """Open the image in fullscreen viewer"""
         self.ensure_one()
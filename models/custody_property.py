@@ -1,12 +1,42 @@
-from datetime import datetime, timedelta
+import logging
+from datetime import date, datetime, timedelta
 
 from dateutil.relativedelta import relativedelta
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.osv import expression
+from odoo.tools import SQL, format_date
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
 
 # Constants
 DEFAULT_MAINTENANCE_REMINDER_DAYS = 7
+TIME_RELATIVE_REFRESH_BATCH_SIZE = 1000
+# Stored fields whose value depends on today's date, refreshed nightly
+TIME_RELATIVE_FIELDS = ['maintenance_overdue', 'maintenance_due_soon', 'warranty_status']
+# A warranty expiring within this many months is reported as expiring
+WARRANTY_EXPIRING_MONTHS = 3
+# Recurrence step of each maintenance frequency, as (months, days);
+# 'custom' recurs every maintenance_interval days
+MAINTENANCE_RECURRENCE_RULES = {
+    'monthly': (1, 0),
+    'quarterly': (3, 0),
+    'biannual': (6, 0),
+    'annual': (12, 0),
+}
+# Maintenance types counted as failures by the failure risk scoring
+FAILURE_MAINTENANCE_TYPES = ('corrective', 'emergency')
+# Failure intervals needed before a category's own statistics are trusted
+MIN_FAILURE_SAMPLES = 3
+# Preventive maintenance is suggested at this fraction of the MTBF
+PREVENTIVE_MTBF_RATIO = 0.5
 
 
 class CustodyProperty(models.Model):
@@ -159,6 +189,19 @@ class CustodyProperty(models.Model):
         help='Users who can approve custody requests for this property'
     )
 
+    # Property -> approver mapping, refreshed when the property approvers,
+    # the category or the category approvers change
+    effective_approver_ids = fields.Many2many(
+        'res.users',
+        'custody_property_effective_approver_rel',
+        'property_id',
+        'user_id',
+        string='Effective Approvers',
+        compute='_compute_effective_approver_ids',
+        store=True,
+        help='Property approvers and the approvers required by its category'
+    )
+
     # Inverse relationship for custody records
     custody_ids = fields.One2many(
         'hr.custody',
@@ -167,6 +210,36 @@ class CustodyProperty(models.Model):
         help='All custody records for this property'
     )
 
+    maintenance_history_ids = fields.One2many(
+        'custody.maintenance.history',
+        'property_id',
+        string='Maintenance History',
+        help='All maintenance records for this property'
+    )
+
+    # Latest maintenance record, cached so forms and lists never scan history
+    last_maintenance_history_id = fields.Many2one(
+        'custody.maintenance.history',
+        string='Last Maintenance Record',
+        compute='_compute_last_maintenance_history',
+        store=True,
+        help='Most recent maintenance record of this property'
+    )
+
+    last_maintenance_type = fields.Selection(
+        related='last_maintenance_history_id.maintenance_type',
+        string='Last Maintenance Type',
+        store=True,
+        help='Type of the most recent maintenance'
+    )
+
+    last_maintenance_performer = fields.Char(
+        related='last_maintenance_history_id.performer_display',
+        string='Last Maintenance By',
+        store=True,
+        help='Who performed the most recent maintenance'
+    )
+
     # History fields
     last_maintenance_date = fields.Date(
         string='Last Maintenance Date',
@@ -176,6 +249,7 @@ class CustodyProperty(models.Model):
 
     next_maintenance_date = fields.Date(
         string='Next Maintenance Date',
+        index=True,
         help='Scheduled date for next maintenance',
         tracking=True
     )
@@ -202,6 +276,43 @@ class CustodyProperty(models.Model):
         tracking=True
     )
     
+    last_maintenance_reminder_date = fields.Date(
+        string='Last Maintenance Reminder',
+        readonly=True,
+        copy=False,
+        help='Date of the last maintenance reminder sent for this property'
+    )
+
+    # Failure prediction, written by _cron_score_failure_risk
+    predicted_failure_date = fields.Date(
+        string='Predicted Failure Date',
+        readonly=True,
+        copy=False,
+        help='Last failure (or purchase) date plus the mean time between '
+             'failures of the category'
+    )
+
+    failure_risk_score = fields.Float(
+        string='Failure Risk (%)',
+        readonly=True,
+        copy=False,
+        aggregator='avg',
+        help='Share of the past failures of the category that happened '
+             'sooner than the time elapsed since the last failure'
+    )
+
+    suggested_maintenance_frequency = fields.Selection([
+        ('monthly', 'Monthly'),
+        ('quarterly', 'Quarterly'),
+        ('biannual', 'Bi-annual'),
+        ('annual', 'Annual'),
+    ],
+        string='Suggested Frequency',
+        readonly=True,
+        copy=False,
+        help='Maintenance frequency suggested by the failure history of the category'
+    )
+
     maintenance_notes = fields.Text(
         string='Maintenance Notes',
         help='Special instructions or notes for maintenance',
@@ -210,8 +321,7 @@ class CustodyProperty(models.Model):
     
     days_to_maintenance = fields.Integer(
         string='Days to Next Maintenance',
-        compute='_compute_maintenance_status',
-        store=True,
+        compute='_compute_days_to_maintenance',
         help='Number of days until next scheduled maintenance'
     )
     
@@ -233,7 +343,6 @@ class CustodyProperty(models.Model):
     maintenance_status_display = fields.Char(
         string='Maintenance Status',
         compute='_compute_maintenance_status_display',
-        store=True,
         help='Human readable maintenance status'
     )
 
@@ -261,6 +370,14 @@ class CustodyProperty(models.Model):
         help='Select the year when warranty expires'
     )
 
+    warranty_expire_date = fields.Date(
+        string='Warranty Expire Date',
+        compute='_compute_warranty_expire_date',
+        store=True,
+        index=True,
+        help='Last day of the warranty expire month'
+    )
+
     warranty_status = fields.Char(
         string='Warranty Status',
         compute='_compute_warranty_status',
@@ -268,6 +385,18 @@ class CustodyProperty(models.Model):
         help='Current warranty status'
     )
 
+    warranty_state = fields.Selection([
+        ('not_set', 'Not Set'),
+        ('expired', 'Expired'),
+        ('expiring', 'Expiring Soon'),
+        ('active', 'Active'),
+    ],
+        string='Warranty State',
+        compute='_compute_warranty_state',
+        search='_search_warranty_state',
+        help='Warranty state relative to today, searchable through the expire date'
+    )
+
     # Device Technical Information
     ip_address = fields.Char(
         string='IP Address',
@@ -365,6 +494,33 @@ class CustodyProperty(models.Model):
             record.custody_count = all_counts.get(record.id, 0)
             record.active_custody_count = active_counts.get(record.id, 0)
 
+    @api.depends('approver_ids', 'category_id.requires_approval', 'category_id.effective_approver_ids')
+    def _compute_effective_approver_ids(self):
+        """Combine property approvers with the approvers of its category"""
+        for record in self:
+            approvers = record.approver_ids
+            if record.category_id.requires_approval:
+                approvers |= record.category_id.effective_approver_ids
+            record.effective_approver_ids = approvers
+
+    @api.depends('maintenance_history_ids.maintenance_date')
+    def _compute_last_maintenance_history(self):
+        """Latest maintenance record of each property, read through the
+        (property_id, maintenance_date desc) index"""
+        history = self.env['custody.maintenance.history']
+        latest = {}
+        if self.ids:
+            history.flush_model(['property_id', 'maintenance_date'])
+            self._cr.execute("""
+                SELECT DISTINCT ON (property_id) property_id, id
+                  FROM custody_maintenance_history
+                 WHERE property_id = ANY(%s)
+              ORDER BY property_id, maintenance_date DESC, id DESC
+            """, [list(self.ids)])
+            latest = dict(self._cr.fetchall())
+        for record in self:
+            record.last_maintenance_history_id = history.browse(latest.get(record.id))
+
     @api.depends('active_custody_count', 'property_status')
     def _compute_current_borrower(self):
         """Compute current borrower information and auto-update status using efficient queries"""
@@ -400,47 +556,50 @@ class CustodyProperty(models.Model):
                 record.active_custody_count == 0
             )
     
+    @api.model
+    def _get_maintenance_reminder_days(self):
+        """Number of days before the next maintenance a property is due soon"""
+        return self.env['res.config.settings']._get_custody_settings()['maintenance_reminder_days']
+
+    @api.depends('next_maintenance_date')
+    def _compute_days_to_maintenance(self):
+        """Days until the next maintenance, evaluated on read"""
+        today = fields.Date.today()
+        for record in self:
+            if record.next_maintenance_date:
+                record.days_to_maintenance = (record.next_maintenance_date - today).days
+            else:
+                record.days_to_maintenance = 0
+
     # NEW: Compute maintenance status
     @api.depends('next_maintenance_date')
     def _compute_maintenance_status(self):
-        """Compute maintenance status indicators"""
+        """Compute maintenance status indicators.
+
+        Both flags are stored for searching and only change when a date
+        crosses a threshold; ``_cron_refresh_time_relative_fields`` keeps them
+        in line with the current date.
+        """
         today = fields.Date.today()
-        # Get maintenance reminder days without sudo - use accessible parameter or default
-        reminder_days_param = self.env['ir.config_parameter'].get_param(
-            'hr_custody.maintenance_reminder_days', str(DEFAULT_MAINTENANCE_REMINDER_DAYS))
-        try:
-            reminder_days = int(reminder_days_param)
-        except (ValueError, TypeError):
-            reminder_days = DEFAULT_MAINTENANCE_REMINDER_DAYS  # Default fallback
-        
+        reminder_days = self._get_maintenance_reminder_days()
+
         for record in self:
             if record.next_maintenance_date:
-                # Calculate days to maintenance
                 delta = (record.next_maintenance_date - today).days
-                record.days_to_maintenance = delta
-                
                 # Check if maintenance is overdue
                 record.maintenance_overdue = delta < 0
-                
                 # Check if maintenance is due soon
                 record.maintenance_due_soon = 0 <= delta <= reminder_days
             else:
-                record.days_to_maintenance = 0
                 record.maintenance_overdue = False
                 record.maintenance_due_soon = False
-    
+
     @api.depends('maintenance_frequency', 'next_maintenance_date')
     def _compute_maintenance_status_display(self):
         """Compute human readable maintenance status"""
         today = fields.Date.today()
-        # Get maintenance reminder days without sudo - use accessible parameter or default
-        reminder_days_param = self.env['ir.config_parameter'].get_param(
-            'hr_custody.maintenance_reminder_days', str(DEFAULT_MAINTENANCE_REMINDER_DAYS))
-        try:
-            reminder_days = int(reminder_days_param)
-        except (ValueError, TypeError):
-            reminder_days = DEFAULT_MAINTENANCE_REMINDER_DAYS  # Default fallback
-        
+        reminder_days = self._get_maintenance_reminder_days()
+
         for record in self:
             if record.maintenance_frequency == 'none':
                 record.maintenance_status_display = _('No Schedule')
@@ -461,25 +620,71 @@ class CustodyProperty(models.Model):
                     record.maintenance_status_display = _('Due Today')
     
     @api.depends('warranty_expire_month', 'warranty_expire_year')
+    def _compute_warranty_expire_date(self):
+        """Last day of the warranty expire month"""
+        for record in self:
+            if record.warranty_expire_month and record.warranty_expire_year:
+                record.warranty_expire_date = date(
+                    int(record.warranty_expire_year), int(record.warranty_expire_month), 1
+                ) + relativedelta(day=31)
+            else:
+                record.warranty_expire_date = False
+
+    @api.model
+    def _get_warranty_state_bounds(self):
+        """Return today and the last day of the expiring window"""
+        today = fields.Date.today()
+        return today, today + relativedelta(months=WARRANTY_EXPIRING_MONTHS, day=31)
+
+    @api.depends('warranty_expire_date')
+    def _compute_warranty_state(self):
+        """Classify the warranty against today's date"""
+        today, expiring_until = self._get_warranty_state_bounds()
+        for record in self:
+            if not record.warranty_expire_date:
+                record.warranty_state = 'not_set'
+            elif record.warranty_expire_date < today:
+                record.warranty_state = 'expired'
+            elif record.warranty_expire_date <= expiring_until:
+                record.warranty_state = 'expiring'
+            else:
+                record.warranty_state = 'active'
+
+    def _search_warranty_state(self, operator, value):
+        """Turn warranty states into ranges on the indexed expire date"""
+        if operator not in ('=', '!=', 'in', 'not in'):
+            raise UserError(_('Operation not supported'))
+        states = {value} if isinstance(value, str) else set(value or [])
+        if operator in ('!=', 'not in'):
+            states = set(dict(self._fields['warranty_state'].selection)) - states
+
+        today, expiring_until = self._get_warranty_state_bounds()
+        state_domains = {
+            'not_set': [('warranty_expire_date', '=', False)],
+            'expired': [('warranty_expire_date', '<', today)],
+            'expiring': ['&', ('warranty_expire_date', '>=', today),
+                         ('warranty_expire_date', '<=', expiring_until)],
+            'active': [('warranty_expire_date', '>', expiring_until)],
+        }
+        domains = [state_domains[state] for state in states if state in state_domains]
+        return expression.OR(domains) if domains else expression.FALSE_DOMAIN
+
+    @api.depends('warranty_expire_date')
     def _compute_warranty_status(self):
-        """Compute warranty status based on expire month and year"""
+        """Compute warranty status based on the warranty expire date"""
         today = fields.Date.today()
         current_year = today.year
         current_month = today.month
-        
+
         for record in self:
-            if not record.warranty_expire_month or not record.warranty_expire_year:
+            if not record.warranty_expire_date:
                 record.warranty_status = _('Not Set')
                 continue
-                
-            expire_year = int(record.warranty_expire_year)
-            expire_month = int(record.warranty_expire_month)
-            
-            # Create date for last day of warranty month
-            from calendar import monthrange
-            last_day = monthrange(expire_year, expire_month)[1]
-            expire_date = fields.Date.from_string(f'{expire_year}-{expire_month:02d}-{last_day}')
-            
+
+            expire_date = record.warranty_expire_date
+            expire_year = expire_date.year
+            expire_month = expire_date.month
+
             if expire_date < today:
                 # Warranty expired
                 months_expired = (current_year - expire_year) * 12 + (current_month - expire_month)
@@ -520,19 +725,106 @@ class CustodyProperty(models.Model):
     @api.onchange('maintenance_frequency', 'maintenance_interval', 'last_maintenance_date')
     def _onchange_maintenance_settings(self):
         """Update next maintenance date when frequency or last date changes"""
-        if self.last_maintenance_date and self.maintenance_frequency != 'none':
-            base_date = self.last_maintenance_date
-            
-            if self.maintenance_frequency == 'monthly':
-                self.next_maintenance_date = base_date + timedelta(days=30)
-            elif self.maintenance_frequency == 'quarterly':
-                self.next_maintenance_date = base_date + timedelta(days=90)
-            elif self.maintenance_frequency == 'biannual':
-                self.next_maintenance_date = base_date + timedelta(days=182)
-            elif self.maintenance_frequency == 'annual':
-                self.next_maintenance_date = base_date + timedelta(days=365)
-            elif self.maintenance_frequency == 'custom' and self.maintenance_interval > 0:
-                self.next_maintenance_date = base_date + timedelta(days=self.maintenance_interval)
+        next_date = self._get_next_maintenance_date(
+            self.last_maintenance_date, self.maintenance_frequency, self.maintenance_interval)
+        if next_date:
+            self.next_maintenance_date = next_date
+
+    # ==========================================
+    # MAINTENANCE RECURRENCE
+    # ==========================================
+
+    @api.model
+    def _get_maintenance_step(self, frequency, interval=0):
+        """Return the (months, days) recurrence step of a maintenance frequency,
+        or None when the frequency does not recur"""
+        if frequency == 'custom':
+            return (0, interval) if interval and interval > 0 else None
+        return MAINTENANCE_RECURRENCE_RULES.get(frequency)
+
+    @api.model
+    def _get_next_maintenance_date(self, base_date, frequency, interval=0):
+        """Next maintenance date one recurrence step after ``base_date``.
+
+        Month based frequencies follow the calendar: a monthly maintenance
+        done on January 31st is next due on the last day of February.
+        """
+        step = self._get_maintenance_step(frequency, interval)
+        if not base_date or not step:
+            return False
+        months, days = step
+        return fields.Date.to_date(base_date) + relativedelta(months=months, days=days)
+
+    @api.model
+    def _get_maintenance_forecast(self, date_from, date_to, domain=None):
+        """Forecast every maintenance occurrence of the fleet between two dates.
+
+        Occurrences are projected from each property's next maintenance date
+        with NumPy, for all properties at once. A property whose next
+        maintenance is already past is reported once on ``date_from`` as
+        overdue, its regular schedule continuing afterwards.
+
+        :return: tuple ``(property_ids, dates, overdue)`` of aligned arrays
+        """
+        if np is None:
+            raise UserError(_('The maintenance forecast requires the numpy Python library.'))
+        date_from, date_to = fields.Date.to_date(date_from), fields.Date.to_date(date_to)
+        query = self._search(expression.AND([domain or [], [
+            ('maintenance_frequency', '!=', 'none'),
+            ('next_maintenance_date', '!=', False),
+            ('property_status', '!=', 'retired'),
+        ]]))
+        rows = self.env.execute_query(query.select(
+            SQL.identifier(self._table, 'id'),
+            SQL.identifier(self._table, 'next_maintenance_date'),
+            SQL.identifier(self._table, 'maintenance_frequency'),
+            SQL.identifier(self._table, 'maintenance_interval'),
+        ))
+        steps = [self._get_maintenance_step(frequency, interval) for _id, _date, frequency, interval in rows]
+        rows = [row + step for row, step in zip(rows, steps) if step]
+        if not rows:
+            empty = np.array([], dtype=int)
+            return empty, np.array([], dtype='datetime64[D]'), np.array([], dtype=bool)
+
+        ids, starts, _frequencies, _intervals, step_months, step_days = map(np.array, zip(*rows))
+        starts = starts.astype('datetime64[D]')
+        start = np.datetime64(date_from, 'D')
+        end = np.datetime64(date_to, 'D')
+        by_month = step_months > 0
+        step = np.where(by_month, step_months, step_days)
+
+        # Range of step indexes k covering [date_from, date_to] per property,
+        # counted in months or days; slightly over-generated then filtered
+        start_months = starts.astype('datetime64[M]')
+        offset_from = np.where(
+            by_month,
+            (start.astype('datetime64[M]') - start_months).astype(int),
+            (start - starts).astype(int))
+        offset_to = np.where(
+            by_month,
+            (end.astype('datetime64[M]') - start_months).astype(int),
+            (end - starts).astype(int))
+        first = np.maximum(offset_from // step, 0)
+        counts = np.maximum(offset_to // step - first + 1, 0)
+
+        # Flatten one row per occurrence instead of a properties x steps grid
+        index = np.repeat(np.arange(len(ids)), counts)
+        k = first[index] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        occurrence_months = start_months[index] + k * step_months[index]
+        month_starts = occurrence_months.astype('datetime64[D]')
+        month_lengths = ((occurrence_months + 1).astype('datetime64[D]') - month_starts).astype(int)
+        start_days = (starts - start_months.astype('datetime64[D]')).astype(int)
+        dates = np.where(
+            by_month[index],
+            month_starts + np.minimum(start_days[index], month_lengths - 1),
+            starts[index] + k * step_days[index])
+        in_range = (dates >= start) & (dates <= end)
+
+        late = starts < start
+        property_ids = np.concatenate([ids[late], ids[index][in_range]])
+        dates = np.concatenate([np.full(late.sum(), start), dates[in_range]])
+        overdue = np.concatenate([np.ones(late.sum(), dtype=bool), np.zeros(in_range.sum(), dtype=bool)])
+        return property_ids, dates, overdue
 
     @api.model
     def name_search(self, name='', args=None, operator='ilike', limit=100):
@@ -621,85 +913,293 @@ class CustodyProperty(models.Model):
     
     # NEW: Send maintenance reminder
     def _send_maintenance_reminder(self):
-        """Send maintenance reminder email"""
-        self.ensure_one()
-        if not self.responsible_person or not self.responsible_person.work_email:
-            return False
-            
-        template = self.env.ref('hr_custody.email_template_maintenance_reminder')
-        if template:
-            template.send_mail(self.id, force_send=True)
-            
-            # Add note in chatter
-            days_left = (self.next_maintenance_date - fields.Date.today()).days
-            self.message_post(
-                body=_("Maintenance reminder sent to %s. Maintenance due in %s days.") % 
-                     (self.responsible_person.name, days_left),
-                subtype_id=self.env.ref('mail.mt_note').id
-            )
-            return True
-        return False
-    
-    # NEW: Send overdue maintenance reminder
-    def _send_overdue_maintenance_reminder(self):
-        """Send overdue maintenance reminder email"""
-        self.ensure_one()
-        if not self.responsible_person or not self.responsible_person.work_email:
-            return False
-            
-        template = self.env.ref('hr_custody.email_template_maintenance_overdue')
-        if template:
-            template.send_mail(self.id, force_send=True)
-            
-            # Add note in chatter
-            days_overdue = abs((self.next_maintenance_date - fields.Date.today()).days)
-            self.message_post(
-                body=_("Overdue maintenance reminder sent to %s. Maintenance is %s days overdue.") % 
-                     (self.responsible_person.name, days_overdue),
-                subtype_id=self.env.ref('mail.mt_note').id
-            )
-            return True
-        return False
-    
-    
+        """Queue one maintenance digest per responsible person of ``self``.
+
+        Each digest lists the overdue and the upcoming maintenance of all the
+        person's properties, so a technician gets a single mail however many
+        devices are due. The chatter notes are logged in one batch.
+
+        :return: the properties a reminder was queued for
+        """
+        properties = self.filtered(
+            lambda p: p.responsible_person.work_email and p.next_maintenance_date)
+        if not properties:
+            return properties
+        properties._send_maintenance_digest()
+
+        # Add notes in chatter
+        today = fields.Date.today()
+        bodies = {}
+        for prop in properties:
+            delta = (prop.next_maintenance_date - today).days
+            if delta < 0:
+                bodies[prop.id] = _("Overdue maintenance reminder sent to %s. Maintenance is %s days overdue.") % (
+                    prop.responsible_person.name, -delta)
+            else:
+                bodies[prop.id] = _("Maintenance reminder sent to %s. Maintenance due in %s days.") % (
+                    prop.responsible_person.name, delta)
+        properties._message_log_batch(bodies=bodies)
+        return properties
+
+    def _send_maintenance_digest(self):
+        """Queue one maintenance digest per responsible person of ``self``,
+        listing the overdue and the upcoming maintenance of their properties"""
+        today = fields.Date.today()
+        base_url = self.get_base_url()
+        mail_values = []
+        for employee, employee_properties in self.grouped('responsible_person').items():
+            overdue = employee_properties.filtered(lambda p: p.next_maintenance_date < today)
+            due = employee_properties - overdue
+            body = self.env['ir.qweb']._render('hr_custody.maintenance_reminder_digest', {
+                'employee': employee,
+                'overdue_properties': overdue,
+                'due_properties': due,
+                'base_url': base_url,
+                'format_date': lambda value: format_date(self.env, value),
+            })
+            if overdue:
+                subject = _('URGENT: Maintenance overdue for %(overdue)s properties, %(due)s due soon',
+                            overdue=len(overdue), due=len(due))
+            else:
+                subject = _('Maintenance Reminder: %s properties') % len(due)
+            mail_values.append({
+                'subject': subject,
+                'author_id': self.env.user.partner_id.id,
+                'body_html': body,
+                'email_to': employee.work_email,
+                'auto_delete': True,
+            })
+        return self.env['mail.mail'].create(mail_values)
+
+    @api.model
+    def _get_maintenance_reminder_domain(self, today):
+        """Domain of the properties due or overdue for maintenance and not
+        reminded yet on ``today``"""
+        return [
+            ('next_maintenance_date', '<=', today + timedelta(days=self._get_maintenance_reminder_days())),
+            ('property_status', '!=', 'maintenance'),  # Not already under maintenance
+            '|', ('last_maintenance_reminder_date', '=', False),
+            ('last_maintenance_reminder_date', '<', today),
+        ]
+
     # NEW: Cron job for maintenance reminders
     @api.model
     def _cron_maintenance_reminder(self):
-        """Send reminders for upcoming maintenance"""
+        """Send one maintenance digest per responsible person.
+
+        Due and overdue properties are selected in a single search and
+        stamped with ``last_maintenance_reminder_date``, so running the cron
+        again on the same day sends nothing twice.
+        """
         today = fields.Date.today()
-        # Get maintenance reminder days without sudo - use accessible parameter or default
-        reminder_days_param = self.env['ir.config_parameter'].get_param(
-            'hr_custody.maintenance_reminder_days', str(DEFAULT_MAINTENANCE_REMINDER_DAYS))
-        try:
-            reminder_days = int(reminder_days_param)
-        except (ValueError, TypeError):
-            reminder_days = DEFAULT_MAINTENANCE_REMINDER_DAYS  # Default fallback
-        
-        # Calculate the date range for sending reminders
-        reminder_date = today + timedelta(days=reminder_days)
-        
-        # Find properties that need maintenance soon
-        properties = self.search([
-            ('next_maintenance_date', '>=', today),
-            ('next_maintenance_date', '<=', reminder_date),
-            ('property_status', '!=', 'maintenance'),  # Not already under maintenance
-        ])
-        
-        # Send reminders for each property
-        for prop in properties:
-            if prop.responsible_person and prop.responsible_person.work_email:
-                prop._send_maintenance_reminder()
-                
-        # Also send reminders for overdue maintenance
-        overdue = self.search([
-            ('next_maintenance_date', '<', today),
-            ('property_status', '!=', 'maintenance'),
-        ])
-        
-        for prop in overdue:
-            if prop.responsible_person and prop.responsible_person.work_email:
-                prop._send_overdue_maintenance_reminder()
-        
+        properties = self.search(self._get_maintenance_reminder_domain(today))
+        properties._send_maintenance_reminder()
+        properties.write({'last_maintenance_reminder_date': today})
+        return True
+
+    def init(self):
+        """Index the rows behind the overdue and due soon filters"""
+        create_index(
+            self._cr, 'custody_property_maintenance_overdue_index', self._table,
+            ['next_maintenance_date'], where='maintenance_overdue',
+        )
+        create_index(
+            self._cr, 'custody_property_maintenance_due_soon_index', self._table,
+            ['next_maintenance_date'], where='maintenance_due_soon',
+        )
+
+    @api.model
+    def _get_time_relative_refresh_ids(self, last_date, today, reminder_days):
+        """Ids of the properties whose date bucket changed since ``last_date``.
+
+        A property only changes bucket when its next maintenance date crosses
+        today (overdue) or today + ``reminder_days`` (due soon), or when the
+        month changes (warranty status). Without a previous run, every
+        property carrying one of those dates is returned.
+        """
+        if not last_date:
+            self._cr.execute("""
+                SELECT id FROM custody_property
+                 WHERE next_maintenance_date IS NOT NULL
+                    OR warranty_expire_date IS NOT NULL
+              ORDER BY id
+            """)
+            return [row[0] for row in self._cr.fetchall()]
+
+        self._cr.execute("""
+            SELECT id FROM custody_property
+             WHERE (next_maintenance_date >= %(last_date)s
+                    AND next_maintenance_date < %(today)s)
+                OR (next_maintenance_date > %(last_date)s::date + %(days)s
+                    AND next_maintenance_date <= %(today)s::date + %(days)s)
+                OR (date_trunc('month', %(last_date)s::date) < date_trunc('month', %(today)s::date)
+                    AND warranty_expire_date IS NOT NULL)
+          ORDER BY id
+        """, {'last_date': last_date, 'today': today, 'days': reminder_days})
+        return [row[0] for row in self._cr.fetchall()]
+
+    @api.model
+    def _cron_refresh_time_relative_fields(self, batch_size=TIME_RELATIVE_REFRESH_BATCH_SIZE, auto_commit=True):
+        """Recompute the stored date-relative fields that changed overnight.
+
+        The last run date and reminder period are kept in system parameters;
+        if the reminder period changed since, every scheduled property is
+        refreshed. Properties are recomputed and committed in batches.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        today = fields.Date.today()
+        reminder_days = self._get_maintenance_reminder_days()
+        last_date = fields.Date.to_date(ICP.get_param('hr_custody.time_relative_refresh_date') or False)
+        last_days = ICP.get_param('hr_custody.time_relative_refresh_days')
+        if last_days != str(reminder_days) or (last_date and last_date > today):
+            last_date = False
+        if last_date == today:
+            return True
+
+        property_ids = self._get_time_relative_refresh_ids(last_date, today, reminder_days)
+        fields_to_compute = [self._fields[fname] for fname in TIME_RELATIVE_FIELDS]
+        for index in range(0, len(property_ids), batch_size):
+            properties = self.browse(property_ids[index:index + batch_size])
+            for field in fields_to_compute:
+                self.env.add_to_compute(field, properties)
+            properties.flush_recordset(TIME_RELATIVE_FIELDS)
+            properties.invalidate_recordset()
+
+            self.env['ir.cron']._notify_progress(
+                done=len(properties),
+                remaining=max(len(property_ids) - index - batch_size, 0))
+            if auto_commit:
+                self.env.cr.commit()
+
+        ICP.set_param('hr_custody.time_relative_refresh_date', fields.Date.to_string(today))
+        ICP.set_param('hr_custody.time_relative_refresh_days', str(reminder_days))
+        return True
+
+    @api.model
+    def _cron_score_failure_risk(self):
+        """Score the failure risk of every property from the failure history.
+
+        Failure intervals (days between two corrective or emergency
+        maintenances of the same property) are fitted per category with
+        NumPy in one pass; categories with fewer than MIN_FAILURE_SAMPLES
+        intervals fall back to the whole fleet. For each property this gives
+        a predicted failure date, a risk score from the empirical distribution
+        of the intervals, and a suggested maintenance frequency. Results are
+        written with a single UPDATE.
+        """
+        if np is None:
+            _logger.warning("Skipping the failure risk scoring: the numpy Python library is not installed.")
+            return True
+        self.env['custody.maintenance.history'].flush_model(
+            ['property_id', 'maintenance_date', 'maintenance_type'])
+        self.flush_model(['category_id', 'purchase_date', 'property_status'])
+        self._cr.execute("""
+            SELECT h.property_id, COALESCE(p.category_id, 0), h.maintenance_date
+              FROM custody_maintenance_history h
+              JOIN custody_property p ON p.id = h.property_id
+             WHERE h.maintenance_type IN %s
+          ORDER BY h.property_id, h.maintenance_date
+        """, [FAILURE_MAINTENANCE_TYPES])
+        failures = self._cr.fetchall()
+        self._cr.execute("""
+            SELECT id, COALESCE(category_id, 0), COALESCE(purchase_date, create_date::date)
+              FROM custody_property
+             WHERE property_status != 'retired'
+          ORDER BY id
+        """)
+        properties = self._cr.fetchall()
+        if not properties:
+            return True
+
+        today = np.datetime64(fields.Date.today(), 'D')
+        property_ids, property_categories, property_dates = map(np.array, zip(*properties))
+        property_dates = property_dates.astype('datetime64[D]')
+        if failures:
+            failure_properties, failure_categories, failure_dates = map(np.array, zip(*failures))
+            failure_dates = failure_dates.astype('datetime64[D]')
+        else:
+            failure_properties = failure_categories = np.array([], dtype=int)
+            failure_dates = np.array([], dtype='datetime64[D]')
+
+        # Intervals between consecutive failures of the same property
+        same_property = failure_properties[1:] == failure_properties[:-1]
+        intervals = (failure_dates[1:] - failure_dates[:-1]).astype(int)[same_property]
+        interval_categories = failure_categories[1:][same_property]
+        if not len(intervals):
+            self._cr.execute("""
+                UPDATE custody_property
+                   SET predicted_failure_date = NULL, failure_risk_score = 0,
+                       suggested_maintenance_frequency = NULL
+            """)
+            self.invalidate_model(['predicted_failure_date', 'failure_risk_score',
+                                   'suggested_maintenance_frequency'])
+            return True
+
+        # Per-category MTBF
+        categories, category_index = np.unique(interval_categories, return_inverse=True)
+        counts = np.bincount(category_index)
+        mtbf = np.bincount(category_index, weights=intervals) / counts
+
+        # Reference date: last failure of the property, else its purchase date
+        last = np.r_[np.flatnonzero(~same_property), len(failure_properties) - 1]
+        last_properties, last_dates = failure_properties[last], failure_dates[last]
+        position = np.minimum(np.searchsorted(last_properties, property_ids), len(last_properties) - 1)
+        has_failed = last_properties[position] == property_ids
+        reference_dates = np.where(has_failed, last_dates[position], property_dates)
+        elapsed = np.maximum((today - reference_dates).astype(int), 0)
+
+        # Category statistics when reliable, fleet statistics otherwise
+        category_position = np.minimum(np.searchsorted(categories, property_categories), len(categories) - 1)
+        reliable = ((categories[category_position] == property_categories)
+                    & (counts[category_position] >= MIN_FAILURE_SAMPLES))
+        property_mtbf = np.where(reliable, mtbf[category_position], intervals.mean())
+
+        # Empirical CDF of the intervals at the elapsed time, per category
+        width = intervals.max() + 1
+        sorted_keys = np.sort(category_index * width + intervals)
+        bounded = np.minimum(elapsed, width - 1)
+        segment_start = np.searchsorted(sorted_keys, category_position * width, side='left')
+        category_below = np.searchsorted(
+            sorted_keys, category_position * width + bounded, side='right') - segment_start
+        fleet_below = np.searchsorted(np.sort(intervals), bounded, side='right')
+        risk = np.where(
+            reliable,
+            category_below / counts[category_position],
+            fleet_below / len(intervals)) * 100.0
+
+        predicted_dates = reference_dates + np.rint(property_mtbf).astype(int)
+
+        # Largest recurrence step not exceeding the preventive target
+        frequency_names = sorted(
+            MAINTENANCE_RECURRENCE_RULES,
+            key=lambda name: MAINTENANCE_RECURRENCE_RULES[name][0])
+        frequency_days = np.array([
+            MAINTENANCE_RECURRENCE_RULES[name][0] * 30.4375 for name in frequency_names])
+        frequency_index = np.maximum(
+            np.searchsorted(frequency_days, property_mtbf * PREVENTIVE_MTBF_RATIO, side='right') - 1, 0)
+        suggested = np.array(frequency_names, dtype=object)[frequency_index]
+
+        self._cr.execute("""
+            UPDATE custody_property p
+               SET predicted_failure_date = s.predicted_failure_date,
+                   failure_risk_score = s.failure_risk_score,
+                   suggested_maintenance_frequency = s.suggested_maintenance_frequency
+              FROM unnest(%s::int[], %s::date[], %s::float8[], %s::varchar[])
+                   AS s(id, predicted_failure_date, failure_risk_score, suggested_maintenance_frequency)
+             WHERE p.id = s.id
+        """, (property_ids.tolist(), predicted_dates.tolist(),
+              np.round(risk, 2).tolist(), suggested.tolist()))
+        self.invalidate_model(['predicted_failure_date', 'failure_risk_score',
+                               'suggested_maintenance_frequency'])
+        return True
+
+    def action_apply_suggested_frequency(self):
+        """Switch the properties to their suggested maintenance frequency"""
+        properties = self.filtered(
+            lambda p: p.suggested_maintenance_frequency
+            and p.suggested_maintenance_frequency != p.maintenance_frequency)
+        for frequency, frequency_properties in properties.grouped('suggested_maintenance_frequency').items():
+            frequency_properties.write({'maintenance_frequency': frequency})
         return True
 
     def action_auto_categorize(self):
@@ -716,12 +1216,12 @@ class CustodyProperty(models.Model):
         """Action to view maintenance history in user-friendly format"""
         self.ensure_one()
         
-        # Get maintenance history records
-        maintenance_records = self.env['custody.maintenance.history'].search([
+        # Stop at the first maintenance record
+        has_history = self.env['custody.maintenance.history'].search_count([
             ('property_id', '=', self.id)
-        ])
-        
-        if not maintenance_records:
+        ], limit=1)
+
+        if not has_history:
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -768,18 +1268,11 @@ class CustodyProperty(models.Model):
         """Override create to handle additional logic"""
         for vals in vals_list:
             # Auto-set next maintenance date if frequency is set
-            if vals.get('last_maintenance_date') and vals.get('maintenance_frequency', 'none') != 'none':
-                base_date = fields.Date.from_string(vals['last_maintenance_date'])
-                
-                if vals['maintenance_frequency'] == 'monthly':
-                    vals['next_maintenance_date'] = base_date + timedelta(days=30)
-                elif vals['maintenance_frequency'] == 'quarterly':
-                    vals['next_maintenance_date'] = base_date + timedelta(days=90)
-                elif vals['maintenance_frequency'] == 'biannual':
-                    vals['next_maintenance_date'] = base_date + timedelta(days=182)
-                elif vals['maintenance_frequency'] == 'annual':
-                    vals['next_maintenance_date'] = base_date + timedelta(days=365)
-                elif vals['maintenance_frequency'] == 'custom' and vals.get('maintenance_interval', 0) > 0:
-                    vals['next_maintenance_date'] = base_date + timedelta(days=vals['maintenance_interval'])
-                    
+            next_date = self._get_next_maintenance_date(
+                vals.get('last_maintenance_date'),
+                vals.get('maintenance_frequency', 'none'),
+                vals.get('maintenance_interval', 0))
+            if next_date:
+                vals['next_maintenance_date'] = next_date
+
         return super(CustodyProperty, self).create(vals_list)
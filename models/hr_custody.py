@@ -1,7 +1,45 @@
-from datetime import date, datetime, timedelta
+import base64
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import format_date, frozendict
+from odoo.tools.sql import create_index
+
+from .custody_image import compare_image_sets
+
+_logger = logging.getLogger(__name__)
+
+# Number of custodies reminded per committed batch by the return reminder cron
+RETURN_REMINDER_BATCH_SIZE = 500
+# Number of returned custodies compared per committed batch by the damage analysis
+DAMAGE_ANALYSIS_BATCH_SIZE = 20
+
+# Custody state machine: transition -> (allowed source states, target state)
+CUSTODY_STATE_TRANSITIONS = {
+    'send': (('draft',), 'to_approve'),
+    'approve': (('to_approve',), 'approved'),
+    'reject': (('to_approve',), 'rejected'),
+    'reset': (('rejected',), 'draft'),
+    'return': (('approved',), 'returned'),
+    'renew_request': (('approved',), 'to_approve'),
+    'renew_approve': (('to_approve',), 'approved'),
+    'renew_refuse': (('to_approve',), 'approved'),
+}
+
+# Security groups whose members may approve any custody request
+ROLE_APPROVER_GROUPS = (
+    'hr_custody.group_custody_officer',
+    'hr_custody.group_custody_manager',
+    'hr.group_hr_manager',
+)
 
 
 class HrCustody(models.Model):
@@ -153,6 +191,27 @@ class HrCustody(models.Model):
         copy=False
     )
 
+    renewal_count = fields.Integer(
+        string='Renewals',
+        readonly=True,
+        copy=False,
+        help='Number of approved renewals of this custody'
+    )
+
+    returned_date = fields.Datetime(
+        string='Returned On',
+        readonly=True,
+        copy=False,
+        help='When the property was actually returned'
+    )
+
+    return_delay_days = fields.Integer(
+        string='Days Returned Late',
+        readonly=True,
+        copy=False,
+        help='Days between the fixed return date and the actual return'
+    )
+
     # ================================================================
     # STATE AND STATUS FIELDS
     # ================================================================
@@ -202,6 +261,13 @@ class HrCustody(models.Model):
         help='Indicates whether an email has been sent or not.'
     )
 
+    last_reminder_date = fields.Date(
+        string='Last Reminder Date',
+        readonly=True,
+        copy=False,
+        help='Date of the last return reminder sent for this custody'
+    )
+
     is_read_only = fields.Boolean(
         string="Check Field",
         compute='_compute_is_read_only'
@@ -281,6 +347,48 @@ class HrCustody(models.Model):
         help='Number of return images'
     )
 
+    # Cached result of the checkout/return image comparison job
+    damage_check_state = fields.Selection([
+        ('pending', 'To Analyze'),
+        ('done', 'Analyzed'),
+        ('missing', 'Missing Images'),
+        ('failed', 'Failed'),
+    ],
+        string='Damage Analysis',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        help='Whether the return images have been compared with the checkout images'
+    )
+
+    image_similarity = fields.Float(
+        string='Image Similarity',
+        readonly=True,
+        copy=False,
+        aggregator='avg',
+        help='Mean structural similarity between each return image and its '
+             'closest checkout image, 1 meaning identical'
+    )
+
+    damage_score = fields.Float(
+        string='Damage Score',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        aggregator='avg',
+        help='Likelihood of damage from 0 to 100, based on the areas that '
+             'changed the most between checkout and return images'
+    )
+
+    damage_heatmap = fields.Image(
+        string='Damage Heatmap',
+        attachment=True,
+        readonly=True,
+        copy=False,
+        prefetch=False,
+        help='Most changed return image, with the differing areas in red'
+    )
+
     # ================================================================
     # COMPUTED FIELDS
     # ================================================================
@@ -294,25 +402,31 @@ class HrCustody(models.Model):
         help='Display the property code'
     )
 
+    # Denormalized text of every field matched by name_search, so that
+    # autocomplete is one trigram index scan instead of joins on six tables
+    search_document = fields.Char(
+        string='Search Document',
+        compute='_compute_search_document',
+        store=True,
+        index='trigram',
+        help='Searchable text combining code, employee, property, reason and approver'
+    )
+
     # ================================================================
     # CONSTRAINTS
     # ================================================================
 
-    @api.constrains('employee_id', 'custody_property_id', 'state')
-    def _check_single_active_custody(self):
-        """Ensure only one active custody per property"""
-        for record in self:
-            if record.state == 'approved':
-                existing = self.search([
-                    ('custody_property_id', '=', record.custody_property_id.id),
-                    ('state', '=', 'approved'),
-                    ('id', '!=', record.id)
-                ])
-                if existing:
-                    raise ValidationError(
-                        _('Property "%s" is already in custody by %s') 
-                        % (record.custody_property_id.name, existing[0].employee_id.name)
-                    )
+    # Only one approved custody per property. Enforced by PostgreSQL through
+    # an exclusion constraint restricted to approved rows, backed by a btree
+    # index, so the check is O(log n) per write and stays correct when
+    # several workers approve requests concurrently. Conflicting rows of
+    # existing databases are resolved by the 18.0.1.0.2 pre-migration.
+    _sql_constraints = [
+        ('single_approved_property',
+         "EXCLUDE USING btree (custody_property_id WITH =) WHERE (state = 'approved')",
+         'This property is already in custody by another employee. '
+         'Only one approved custody per property is allowed.'),
+    ]
 
     @api.constrains('return_date')
     def _check_return_date_reasonable(self):
@@ -385,42 +499,51 @@ class HrCustody(models.Model):
             else:
                 record.property_code_display = False
 
-    @api.depends('custody_property_id', 'custody_property_id.category_id')
+    @api.depends('name', 'purpose', 'employee_id.name', 'custody_property_id.name',
+                 'custody_property_id.property_code', 'approved_by_id.name')
+    def _compute_search_document(self):
+        """Concatenate the fields searched by name_search"""
+        for record in self:
+            record.search_document = '\n'.join(filter(None, [
+                record.name,
+                record.employee_id.name,
+                record.custody_property_id.name,
+                record.purpose,
+                record.custody_property_id.property_code,
+                record.approved_by_id.name,
+            ])) or False
+
+    @api.depends('custody_property_id.category_id.requires_approval',
+                 'custody_property_id.category_id.effective_approver_ids')
     def _compute_category_approvers(self):
         """Compute approvers based on property category"""
         for record in self:
-            approvers = self.env['res.users']
-            
-            if record.custody_property_id and record.custody_property_id.category_id:
-                category = record.custody_property_id.category_id
-                if category.requires_approval:
-                    approvers = category.get_effective_approvers()
-                    
-            record.category_approver_ids = approvers
-
-    @api.depends('category_approver_ids', 'custody_property_id')
+            category = record.custody_property_id.category_id
+            if category.requires_approval:
+                record.category_approver_ids = category.effective_approver_ids
+            else:
+                record.category_approver_ids = False
+
+    @api.depends('category_approver_ids')
     def _compute_effective_approvers(self):
         """Combine all approvers for this custody request using role-based system"""
+        role_approvers = self.env['res.users'].browse(self._get_role_approver_ids())
         for record in self:
-            # Get default approvers from predefined security groups
-            custody_officer = self.env.ref('hr_custody.group_custody_officer', raise_if_not_found=False)
-            custody_manager = self.env.ref('hr_custody.group_custody_manager', raise_if_not_found=False)
-            hr_manager = self.env.ref('hr.group_hr_manager', raise_if_not_found=False)
-            
-            all_approvers = self.env['res.users']
-            
-            # Use security group members as default approvers
-            if custody_officer:
-                all_approvers |= custody_officer.users
-            if custody_manager:
-                all_approvers |= custody_manager.users
-            if hr_manager:
-                all_approvers |= hr_manager.users
-            
-            # Add category approvers if they exist
-            all_approvers |= record.category_approver_ids
-            
-            record.effective_approver_ids = all_approvers
+            record.effective_approver_ids = role_approvers | record.category_approver_ids
+
+    @api.model
+    def _get_role_approver_ids(self):
+        """Return the ids of the users approving through a security group.
+
+        Read once per call for all the records involved, so users added to
+        a group by any means are taken into account right away.
+        """
+        users = self.env['res.users']
+        for xmlid in ROLE_APPROVER_GROUPS:
+            group = self.env.ref(xmlid, raise_if_not_found=False)
+            if group:
+                users |= group.sudo().users
+        return tuple(users.ids)
 
     # ================================================================
     # ONCHANGE METHODS
@@ -500,65 +623,93 @@ class HrCustody(models.Model):
     # EMAIL AND REMINDER METHODS
     # ================================================================
 
+    def init(self):
+        """Index the rows scanned by the daily return reminder"""
+        create_index(
+            self._cr, 'hr_custody_return_reminder_index', self._table,
+            ['return_date', 'id'],
+            where="state = 'approved' AND return_type = 'date'",
+        )
+
     def mail_reminder(self):
         """Send return reminder mail for FIXED DATE returns only"""
-        now = datetime.now() + timedelta(days=1)
-        date_now = now.date()
+        return self._cron_custody_return_reminder()
 
-        # Send reminders ONLY for fixed date returns that are overdue
-        fixed_date_records = self.search([
+    @api.model
+    def _get_return_reminder_domain(self, today):
+        """Domain of the fixed-date custodies due for a reminder on ``today``"""
+        return [
             ('state', '=', 'approved'),
             ('return_type', '=', 'date'),
-            ('return_date', '!=', False)
-        ])
+            ('return_date', '<=', today + timedelta(days=1)),
+            '|', ('last_reminder_date', '=', False), ('last_reminder_date', '<', today),
+        ]
 
-        for custody_record in fixed_date_records:
-            if custody_record.return_date <= date_now:
-                self._send_fixed_date_reminder(custody_record)
+    @api.model
+    def _cron_custody_return_reminder(self, batch_size=RETURN_REMINDER_BATCH_SIZE, auto_commit=True):
+        """Send return reminders for fixed-date custodies that are due.
+
+        Only the due rows are selected, in batches of ``batch_size``. Each
+        batch is stamped with ``last_reminder_date`` and committed, so a run
+        interrupted by a worker timeout resumes with the custodies that have
+        not been reminded yet today instead of starting over.
+        """
+        today = fields.Date.today()
+        domain = self._get_return_reminder_domain(today)
+        remaining = self.search_count(domain)
+        while remaining:
+            custodies = self.search(domain, order='id', limit=batch_size)
+            if not custodies:
+                break
+            custodies._send_return_reminders()
+            custodies.write({'last_reminder_date': today})
+
+            remaining = max(remaining - len(custodies), 0)
+            self.env['ir.cron']._notify_progress(done=len(custodies), remaining=remaining)
+            if auto_commit:
+                self.env.cr.commit()
+        return True
 
     def _send_fixed_date_reminder(self, custody_record):
         """Send reminder for fixed date returns only"""
-        # Get base URL without sudo - use system parameter accessible to current user
-        base_url = self.env['ir.config_parameter'].get_param('web.base.url')
-        if not base_url:
-            # Fallback to default if parameter not accessible
-            base_url = 'http://localhost:8069'
-        url = f"{base_url}/web#id={custody_record.id}&view_type=form&model=hr.custody"
-
-        mail_content = _(
-            'Hi %s,<br/>As per the %s you took %s on %s for the reason of %s.<br/>'
-            'Due date was %s which has passed.<br/><br/>'
-            'Please return the property as soon as possible. Otherwise, you can '
-            'renew the reference number(%s) by extending the return date through '
-            'following link.<br/><br/>'
-            '<div style = "text-align: center; margin-top: 16px;"><a href = "%s"'
-            'style = "padding: 5px 10px; font-size: 12px; line-height: 18px; color: #FFFFFF; '
-            'border-color:#875A7B;text-decoration: none; display: inline-block; '
-            'margin-bottom: 0px; font-weight: 400;text-align: center; vertical-align: middle; '
-            'cursor: pointer; white-space: nowrap; background-image: none; '
-            'background-color: #875A7B; border: 1px solid #875A7B; border-radius:3px;">'
-            'Renew %s</a></div>'
-        ) % (
-            custody_record.employee_id.name,
-            custody_record.name,
-            custody_record.custody_property_id.name,
-            custody_record.date_request,
-            custody_record.purpose,
-            custody_record.return_date,
-            custody_record.name,
-            url,
-            custody_record.name
-        )
+        return custody_record._send_return_reminders()
 
-        main_content = {
-            'subject': _('REMINDER On %s') % custody_record.name,
-            'author_id': self.env.user.partner_id.id,
-            'body_html': mail_content,
-            'email_to': custody_record.employee_id.work_email,
-        }
+    def _send_return_reminders(self):
+        """Queue the return reminders of ``self`` in the outgoing mail queue.
 
-        mail_id = self.env['mail.mail'].create(main_content)
-        mail_id.send()
+        All mails are rendered in a single batch and delivered later by the
+        mail queue, so a slow SMTP server never holds the reminder transaction.
+        When the ``hr_custody.reminder_digest`` parameter is enabled, every
+        employee receives one digest listing all of their due custodies.
+        """
+        custodies = self.filtered(lambda c: c.employee_id.work_email)
+        if not custodies:
+            return False
+
+        digest = self.env['res.config.settings']._get_custody_settings()['reminder_digest']
+        if not digest:
+            template = self.env.ref('hr_custody.email_template_custody_return_reminder')
+            template.send_mail_batch(custodies.ids)
+            return True
+
+        base_url = self.get_base_url()
+        mail_values = []
+        for employee, employee_custodies in custodies.grouped('employee_id').items():
+            body = self.env['ir.qweb']._render('hr_custody.custody_return_reminder_digest', {
+                'employee': employee,
+                'custodies': employee_custodies,
+                'base_url': base_url,
+                'format_date': lambda value: format_date(self.env, value),
+            })
+            mail_values.append({
+                'subject': _('REMINDER: %s properties due for return') % len(employee_custodies),
+                'author_id': self.env.user.partner_id.id,
+                'body_html': body,
+                'email_to': employee.work_email,
+                'auto_delete': True,
+            })
+        self.env['mail.mail'].create(mail_values)
+        return True
 
     def send_mail(self):
         """Send email notification using a predefined template."""
@@ -590,23 +741,40 @@ class HrCustody(models.Model):
                 raise UserError(_('You cannot delete approved custody records'))
         return super(HrCustody, self).unlink()
 
-    def write(self, vals):
-        """Override write method to handle state changes"""
-        result = super(HrCustody, self).write(vals)
-        if 'state' in vals:
-            for record in self:
-                record.message_post(
-                    body=_('Custody state changed to %s') % dict(record._fields['state'].selection)[record.state]
-                )
-        return result
-
     # ================================================================
     # STATE MANAGEMENT METHODS
     # ================================================================
 
+    def _transition(self, transition, values=None):
+        """Apply a transition of the custody state machine to ``self``.
+
+        The state and the values of the transition are written together, and
+        records sharing the same values are written at once, so a transition
+        costs one ``write`` (and one recompute/tracking pass at flush) per
+        distinct set of values instead of one per assigned field and record.
+
+        :param str transition: key of ``CUSTODY_STATE_TRANSITIONS``
+        :param values: extra values to write, either a dict shared by all
+            records or a callable returning the dict of a given record
+        """
+        sources, target = CUSTODY_STATE_TRANSITIONS[transition]
+        invalid = self.filtered(lambda r: r.state not in sources)
+        if invalid:
+            raise UserError(_('This action is not allowed for %s in their current state')
+                            % ', '.join(invalid.mapped('name')))
+
+        groups = defaultdict(list)
+        for record in self:
+            vals = values(record) if callable(values) else dict(values or {})
+            vals['state'] = target
+            groups[frozendict(vals)].append(record.id)
+        for vals, record_ids in groups.items():
+            self.browse(record_ids).write(dict(vals))
+        return True
+
     def sent(self):
         """Move the current record to the 'to_approve' state."""
-        self.state = 'to_approve'
+        self._transition('send')
         # Send notification using role-based system
         self.message_post(
             body=_('Custody request sent for approval to authorized approvers (Custody Officer/Manager, HR Manager)'),
@@ -615,87 +783,182 @@ class HrCustody(models.Model):
 
     def set_to_draft(self):
         """Set the current record to the 'draft' state."""
-        self.state = 'draft'
+        self._transition('reset')
 
     def renew_approve(self):
         """The function Used to renew and approve the current custody record."""
-        for custody in self.env['hr.custody'].search([
+        if self.search_count([
             ('custody_property_id', '=', self.custody_property_id.id),
-            ('id', '!=', self.id)
-        ]):
-            if custody.state == "approved":
-                raise UserError(_("Custody is not available now"))
+            ('id', '!=', self.id),
+            ('state', '=', 'approved')
+        ], limit=1):
+            raise UserError(_("Custody is not available now"))
+
+        self._transition('renew_approve', lambda record: record._get_renew_approve_values())
 
-        self.return_date = self.renew_date
-        self.renew_date = False
-        self.state = 'approved'
+    def _get_renew_approve_values(self):
+        """Values written on ``self`` when its renewal is approved.
+
+        The renewed return date replaces the current one. The original
+        approval is kept so custody duration and approval time still measure
+        the first checkout.
+        """
+        self.ensure_one()
+        return {
+            'return_date': self.renew_date,
+            'renew_date': False,
+            'renewal_count': self.renewal_count + 1,
+        }
 
     def renew_refuse(self):
         """the function used to refuse the renewal of the current custody record"""
-        self.renew_date = False
-        self.state = 'approved'
+        self._transition('renew_refuse', {'renew_date': False})
 
     def approve(self):
-        """Approve the current custody record.
-        
-        Validates user permissions, checks property availability,
-        records approval metadata, and updates property status.
+        """Approve the current custody record(s).
+
+        The whole recordset is validated and approved in one pass, see
+        :meth:`_approve_batch`. A single record keeps the historical behaviour
+        of raising the rejection reason, a batch reports it per record.
+        """
+        rejected = self._approve_batch()
+        if not rejected:
+            return True
+        if len(self) == 1:
+            raise UserError(rejected[self.id])
+        return self._batch_result_action(_('Approval'), rejected)
+
+    def action_bulk_approve(self):
+        """Approve the requests selected in the list view and report the outcome"""
+        rejected = self._approve_batch()
+        return self._batch_result_action(_('Approval'), rejected)
+
+    def _approve_batch(self):
+        """Approve every record of ``self`` that can be approved.
+
+        Permissions are resolved once for the current user, conflicting
+        approved custodies are looked up for all properties with a single
+        grouped query, and approval metadata and property status are written
+        with one ``write`` per model. Renewal requests go through the
+        ``renew_approve`` transition: the renewed return date is applied, the
+        renewal is counted and the original approval is kept.
+
+        :return: dict mapping the id of each skipped record to the reason
         """
-        # Check if current user has approval permissions
         current_user = self.env.user
-        is_hr_manager = current_user.has_group('hr.group_hr_manager')
-        is_custody_manager = current_user.has_group('hr_custody.group_custody_manager')
-        is_custody_officer = current_user.has_group('hr_custody.group_custody_officer')
-        
+        is_role_approver = (
+            current_user.has_group('hr.group_hr_manager')
+            or current_user.has_group('hr_custody.group_custody_manager')
+            or current_user.has_group('hr_custody.group_custody_officer')
+        )
+
+        rejected = {}
+        candidate_ids = []
         for record in self:
-            # Refresh approvers to ensure we have the latest
-            record._compute_effective_approvers()
-            
-            # Check approval permissions - use new custody roles
-            has_approval_permission = (
-                is_custody_manager or 
-                is_custody_officer or 
-                is_hr_manager or 
-                current_user in record.effective_approver_ids
+            if record.state != 'to_approve':
+                rejected[record.id] = _('Only requests waiting for approval can be approved')
+            elif not is_role_approver and current_user not in record.category_approver_ids:
+                rejected[record.id] = _(
+                    "You don't have permission to approve this request. Authorized approvers are: %s"
+                ) % ', '.join(record.effective_approver_ids.mapped('name'))
+            else:
+                candidate_ids.append(record.id)
+        candidates = self.browse(candidate_ids)
+
+        # One grouped query for every property already in custody
+        busy_property_ids = {
+            custody_property.id
+            for [custody_property] in self._read_group(
+                [
+                    ('custody_property_id', 'in', candidates.custody_property_id.ids),
+                    ('state', '=', 'approved'),
+                ],
+                ['custody_property_id'],
             )
-            
-            if not has_approval_permission:
-                # Get authorized approvers from effective_approver_ids
-                authorized_approvers = record.effective_approver_ids
-                
-                raise UserError(
-                    _("You don't have permission to approve this request. Authorized approvers are: %s")
-                    % (', '.join(authorized_approvers.mapped('name')))
-                )
-
-            # Check property availability - use domain search to avoid N+1 query
-            existing_approved = self.env['hr.custody'].search_count([
-                ('custody_property_id', '=', record.custody_property_id.id),
-                ('id', '!=', record.id),
-                ('state', '=', 'approved')
-            ])
-            if existing_approved > 0:
-                raise UserError(_("Custody is not available now"))
-
-            # Record approval information
-            record.approved_by_id = current_user
-            record.approved_date = fields.Datetime.now()
-            
-            # Update checkout image date if image exists but date not set
-            if record.checkout_image and not record.checkout_image_date:
-                record.checkout_image_date = fields.Datetime.now()
+        }
 
-            # Update property status to 'in_use' when approved
-            if record.custody_property_id.property_status == 'available':
-                record.custody_property_id.property_status = 'in_use'
+        approved_ids = []
+        for record in candidates:
+            property_id = record.custody_property_id.id
+            if property_id in busy_property_ids:
+                rejected[record.id] = _("Custody is not available now")
+                continue
+            # Two requests of the batch may target the same property
+            busy_property_ids.add(property_id)
+            approved_ids.append(record.id)
+        approved = self.browse(approved_ids)
+        if not approved:
+            return rejected
+
+        now = fields.Datetime.now()
+        # Update checkout image date if image exists but date not set
+        missing_image_date_ids = set(approved.with_context(bin_size=True).filtered(
+            lambda r: r.checkout_image and not r.checkout_image_date
+        ).ids)
+
+        # Update property status to 'in_use' when approved
+        approved.custody_property_id.filtered(
+            lambda p: p.property_status == 'available'
+        ).write({'property_status': 'in_use'})
+
+        # Renewal requests extend the running custody instead of starting one
+        renewals = approved.filtered(lambda r: r.is_renew_return_date and r.renew_date)
+        first_approvals = approved - renewals
+        renewals._transition('renew_approve', lambda record: record._get_renew_approve_values())
+        first_approvals._transition('approve', lambda record: {
+            'approved_by_id': current_user.id,
+            'approved_date': now,
+            **({'checkout_image_date': now} if record.id in missing_image_date_ids else {}),
+        })
+
+        bodies = {record.id: _('Request approved by %s') % current_user.name for record in first_approvals}
+        bodies.update({record.id: _('Renewal approved by %s') % current_user.name for record in renewals})
+        approved._message_log_batch(bodies=bodies)
+        return rejected
 
-            record.state = 'approved'
+    def _batch_result_action(self, title, rejected):
+        """Build the notification summarising a batch operation on ``self``.
 
-            # Post message for tracking
-            record.message_post(
-                body=_('Request approved by %s') % current_user.name,
-                message_type='notification'
+        The notification can't render line breaks, so it only counts the
+        skipped records per reason and the list of the skipped records is
+        opened next.
+
+        :param str title: name of the operation shown in the notification
+        :param dict rejected: reason per id of the records that were skipped
+        """
+        done_count = len(self) - len(rejected)
+        message = _('%(done)s of %(total)s record(s) processed.') % {
+            'done': done_count,
+            'total': len(self),
+        }
+        next_action = {'type': 'ir.actions.client', 'tag': 'soft_reload'}
+        if rejected:
+            reasons = defaultdict(int)
+            for reason in rejected.values():
+                reasons[reason] += 1
+            message += ' ' + _('Skipped: %s') % '; '.join(
+                f"{reason} ({count})" for reason, count in reasons.items()
             )
+            next_action = {
+                'type': 'ir.actions.act_window',
+                'name': _('%s: Skipped Records') % title,
+                'res_model': self._name,
+                'view_mode': 'list,form',
+                'views': [(False, 'list'), (False, 'form')],
+                'domain': [('id', 'in', list(rejected))],
+                'target': 'current',
+            }
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': title,
+                'message': message,
+                'sticky': bool(rejected),
+                'type': 'warning' if rejected else 'success',
+                'next': next_action,
+            }
+        }
 
     def refuse_with_reason(self):
         """Open wizard to enter rejection reason."""
@@ -713,29 +976,77 @@ class HrCustody(models.Model):
         }
 
     def set_to_return(self):
-        """The function used to set the current custody record to the 'returned' state"""
+        """The function used to set the current custody record(s) to the 'returned' state.
+
+        All records are returned in one pass, see :meth:`_return_batch`.
+        """
+        rejected = self._return_batch()
+        if not rejected:
+            return True
+        if len(self) == 1:
+            raise UserError(rejected[self.id])
+        return self._batch_result_action(_('Return'), rejected)
+
+    def action_bulk_return(self):
+        """Return the custodies selected in the list view and report the outcome"""
+        rejected = self._return_batch()
+        return self._batch_result_action(_('Return'), rejected)
+
+    def _return_batch(self):
+        """Return every approved custody of ``self`` in a single transaction.
+
+        Property statuses and custody values are written with one ``write``
+        per distinct value and each custody gets one summarized chatter note.
+
+        :return: dict mapping the id of each skipped record to the reason
+        """
+        rejected = {}
+        returned_ids = []
+        for record in self:
+            if record.state != 'approved':
+                rejected[record.id] = _('Only approved custodies can be returned')
+            else:
+                returned_ids.append(record.id)
+        to_return = self.browse(returned_ids)
+        if not to_return:
+            return rejected
+
+        now = fields.Datetime.now()
+        today = fields.Date.today()
+
         # Update return image date if image exists but date not set
-        if self.return_image and not self.return_image_date:
-            self.return_image_date = fields.Datetime.now()
-            
+        missing_image_date_ids = set(to_return.with_context(bin_size=True).filtered(
+            lambda r: r.return_image and not r.return_image_date
+        ).ids)
+
         # Update property status to 'available' when returned
-        if self.custody_property_id.property_status == 'in_use':
-            self.custody_property_id.property_status = 'available'
+        to_return.custody_property_id.filtered(
+            lambda p: p.property_status == 'in_use'
+        ).write({'property_status': 'available'})
+
+        def return_values(record):
+            vals = {'returned_date': now, 'damage_check_state': 'pending'}
+            if record.id in missing_image_date_ids:
+                vals['return_image_date'] = now
+            # Don't automatically set return_date for flexible returns
+            if record.return_type == 'date':
+                if record.return_date:
+                    vals['return_delay_days'] = max((today - record.return_date).days, 0)
+                vals['return_date'] = today
+            return vals
+
+        to_return._transition('return', return_values)
+        to_return._trigger_damage_analysis()
 
-        self.state = 'returned'
-        # Don't automatically set return_date for flexible returns
-        if self.return_type == 'date':
-            self.return_date = fields.Date.today()
-            
         # Post message about return with condition notes if provided
-        message = _('Equipment returned')
-        if self.return_condition_notes:
-            message += _(' with notes: %s') % self.return_condition_notes
-            
-        self.message_post(
-            body=message,
-            message_type='notification'
-        )
+        bodies = {}
+        for record in to_return:
+            message = _('Equipment returned')
+            if record.return_condition_notes:
+                message += _(' with notes: %s') % record.return_condition_notes
+            bodies[record.id] = message
+        to_return._message_log_batch(bodies=bodies)
+        return rejected
 
     # ================================================================
     # UTILITY METHODS
@@ -747,10 +1058,10 @@ class HrCustody(models.Model):
         if not user_id:
             user_id = self.env.user.id
 
-        return self.search([
-            ('custody_property_id.approver_ids', 'in', [user_id]),
-            ('state', '=', 'to_approve')
-        ])
+        domain = [('state', '=', 'to_approve')]
+        if user_id not in self._get_role_approver_ids():
+            domain.append(('custody_property_id.effective_approver_ids', 'in', [user_id]))
+        return self.search(domain)
 
     @api.model
     def name_search(self, name='', args=None, operator='ilike', limit=100):
@@ -758,6 +1069,11 @@ class HrCustody(models.Model):
         if args is None:
             args = []
 
+        if name and operator in ('ilike', 'like'):
+            # Served by the trigram index of search_document
+            records = self.search([('search_document', operator, name)] + args, limit=limit)
+            return records.name_get()
+
         if name:
             domain = [
                 '|', '|', '|', '|', '|',
@@ -927,4 +1243,77 @@ class HrCustody(models.Model):
             },
             'help': '<p class="o_view_nocontent_smiling_face">No images found</p>'
                    '<p>You can select multiple images and delete them at once.</p>'
-        }
\ No newline at end of file
+        }
+
+    def _trigger_damage_analysis(self):
+        """Wake up the damage analysis job if a custody awaits it"""
+        if any(custody.damage_check_state == 'pending' for custody in self):
+            self.env.ref('hr_custody.ir_cron_analyze_return_images')._trigger()
+
+    def action_analyze_return_images(self):
+        """Queue the damage analysis of the returned custodies of ``self``"""
+        returned = self.filtered(lambda c: c.state == 'returned')
+        returned.write({'damage_check_state': 'pending'})
+        returned._trigger_damage_analysis()
+        return True
+
+    def _analyze_return_images(self):
+        """Compare the return images of ``self`` with its checkout images.
+
+        :return: values to write on the record
+        """
+        self.ensure_one()
+        sources = {'checkout': [], 'return': []}
+        for image in self.image_ids.with_context(bin_size=False):
+            data = image.image_512 or image.image
+            if image.image_type in sources and data:
+                sources[image.image_type].append(base64.b64decode(data))
+        if not sources['checkout'] or not sources['return']:
+            return {
+                'damage_check_state': 'missing',
+                'image_similarity': 0.0,
+                'damage_score': 0.0,
+                'damage_heatmap': False,
+            }
+        similarity, score, heatmap = compare_image_sets(sources['checkout'], sources['return'])
+        return {
+            'damage_check_state': 'done',
+            'image_similarity': similarity,
+            'damage_score': score,
+            'damage_heatmap': base64.b64encode(heatmap),
+        }
+
+    @api.model
+    def _cron_analyze_return_images(self, batch_size=DAMAGE_ANALYSIS_BATCH_SIZE, auto_commit=True):
+        """Score the likely damage of the returned custodies in batches.
+
+        The return images of each pending custody are compared with its
+        checkout images and the similarity, damage score and heatmap are
+        cached on the custody, so returns can be sorted by likely damage.
+        Custodies whose images cannot be decoded are marked as failed so they
+        are not retried forever. Without NumPy the job only logs a warning,
+        the custodies staying pending until it is installed.
+        """
+        if np is None:
+            _logger.warning("Skipping the custody damage analysis: the numpy Python library is not installed.")
+            return True
+        domain = [('damage_check_state', '=', 'pending')]
+        remaining = self.search_count(domain)
+        while remaining:
+            custodies = self.search(domain, order='id', limit=batch_size)
+            if not custodies:
+                break
+            for custody in custodies:
+                try:
+                    values = custody._analyze_return_images()
+                except Exception:
+                    _logger.exception("Failed to analyze the images of custody %s", custody.id)
+                    values = {'damage_check_state': 'failed'}
+                custody.write(values)
+            custodies.invalidate_recordset()
+
+            remaining = max(remaining - len(custodies), 0)
+            self.env['ir.cron']._notify_progress(done=len(custodies), remaining=remaining)
+            if auto_commit:
+                self.env.cr.commit()
+        return True
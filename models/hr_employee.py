@@ -6,21 +6,24 @@ class HrEmployee(models.Model):
 
     # Count only active custodies
     custody_count = fields.Integer(
-        compute='_compute_custody_count',
+        compute='_compute_custody_counts',
         string='# Active Custody',
+        store=True,
         help='Number of active custody requests'
     )
 
     # Track total custody history
     total_custody_count = fields.Integer(
-        compute='_compute_total_custody_count',
+        compute='_compute_custody_counts',
         string='# Total Custody',
+        store=True,
         help='Total number of custody requests (all states)'
     )
 
     equipment_count = fields.Integer(
-        compute='_compute_equipment_count',
+        compute='_compute_custody_counts',
         string='# Equipment',
+        store=True,
         help='Number of equipment currently in possession'
     )
 
@@ -32,41 +35,33 @@ class HrEmployee(models.Model):
         help='Custody records for this employee'
     )
 
-    @api.depends()
-    def _compute_custody_count(self):
-        """Count only ACTIVE custody (approved state)"""
-        for employee in self:
-            active_custody = self.env['hr.custody'].search_count([
-                ('employee_id', '=', employee.id),
-                ('state', '=', 'approved')  # Only approved state
-            ])
-            employee.custody_count = active_custody
-
-    @api.depends()
-    def _compute_total_custody_count(self):
-        """Count ALL custody requests (all states)"""
-        for employee in self:
-            total_custody = self.env['hr.custody'].search_count([
-                ('employee_id', '=', employee.id)
-                # No filter on state = all states
-            ])
-            employee.total_custody_count = total_custody
-
-    @api.depends()
-    def _compute_equipment_count(self):
-        """Count unique equipment currently in possession (approved state only)"""
-        for employee in self:
-            equipment_records = self.env['hr.custody'].search([
-                ('employee_id', '=', employee.id),
-                ('state', '=', 'approved')  # Only approved state
-            ])
+    @api.depends('custody_ids.state', 'custody_ids.custody_property_id')
+    def _compute_custody_counts(self):
+        """Compute the three custody counters with one grouped query.
+
+        The counters are stored and recomputed by the ORM only for the
+        employees whose custodies change state or property. The query runs
+        as superuser so stored values do not depend on who triggered it.
+        """
+        total_counts = dict.fromkeys(self.ids, 0)
+        active_counts = {}
+        equipment_counts = {}
+        custody_data = self.env['hr.custody'].sudo()._read_group(
+            [('employee_id', 'in', self.ids)],
+            ['employee_id', 'state'],
+            ['__count', 'custody_property_id:count_distinct'],
+        )
+        for employee, state, count, property_count in custody_data:
+            total_counts[employee.id] += count
+            # Only approved state is active
+            if state == 'approved':
+                active_counts[employee.id] = count
+                equipment_counts[employee.id] = property_count
 
-            # Count unique properties
-            unique_properties = set()
-            for custody in equipment_records:
-                unique_properties.add(custody.custody_property_id.id)
-
-            employee.equipment_count = len(unique_properties)
+        for employee in self:
+            employee.custody_count = active_counts.get(employee.id, 0)
+            employee.total_custody_count = total_counts.get(employee.id, 0)
+            employee.equipment_count = equipment_counts.get(employee.id, 0)
 
     def custody_view(self):
         """View all custody records for this employee"""
@@ -115,3 +110,32 @@ class HrEmployee(models.Model):
             'domain': [('id', 'in', property_ids)],
             'context': {'create': False, 'edit': False}  # Read-only
         }
+
+    def action_offboard_custody(self):
+        """Return all equipment in possession of the selected employees at once"""
+        custodies = self.env['hr.custody'].search([
+            ('employee_id', 'in', self.ids),
+            ('state', '=', 'approved')
+        ])
+        if not custodies:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('No Active Custody'),
+                    'message': _('There is no equipment to return.'),
+                    'sticky': False,
+                    'type': 'info',
+                }
+            }
+
+        result = custodies.action_bulk_return()
+
+        # One summary per employee in addition to the note on each custody
+        returned = custodies.filtered(lambda c: c.state == 'returned')
+        returned.employee_id._message_log_batch(bodies={
+            employee.id: _('Offboarding: returned %s') % ', '.join(
+                employee_custodies.mapped('custody_property_id.name'))
+            for employee, employee_custodies in returned.grouped('employee_id').items()
+        })
+        return result
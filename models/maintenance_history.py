@@ -1,4 +1,5 @@
 from odoo import api, fields, models, _
+from odoo.tools.sql import create_index
 
 
 class MaintenanceHistory(models.Model):
@@ -73,6 +74,13 @@ class MaintenanceHistory(models.Model):
         store=True
     )
     
+    def init(self):
+        """Index the latest maintenance records of each property"""
+        create_index(
+            self._cr, 'custody_maintenance_history_property_date_index', self._table,
+            ['property_id', 'maintenance_date DESC'],
+        )
+
     @api.depends('maintenance_date', 'maintenance_type', 'property_id')
     def _compute_display_name(self):
         """Compute display name for record"""
@@ -0,0 +1,77 @@
+import json
+
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import ValidationError
+from odoo.tools import frozendict, str2bool
+
+from .custody_category import DEFAULT_CATEGORY_KEYWORDS
+from .custody_property import DEFAULT_MAINTENANCE_REMINDER_DAYS
+
+
+class ResConfigSettings(models.TransientModel):
+    """Custody settings, and the typed cached reader used by the module.
+
+    ``_get_custody_settings`` parses the ``hr_custody.*`` parameters once per
+    registry. Writing any ``ir.config_parameter`` clears the registry caches,
+    so saved settings are picked up without a restart.
+    """
+    _inherit = 'res.config.settings'
+
+    custody_maintenance_reminder_days = fields.Integer(
+        string='Maintenance Reminder Days',
+        config_parameter='hr_custody.maintenance_reminder_days',
+        default=DEFAULT_MAINTENANCE_REMINDER_DAYS,
+        help='Number of days before the next maintenance a property is due soon'
+    )
+
+    custody_reminder_digest = fields.Boolean(
+        string='Return Reminder Digest',
+        config_parameter='hr_custody.reminder_digest',
+        help='Send each employee one reminder listing all their due custodies'
+    )
+
+    custody_category_keywords = fields.Char(
+        string='Category Keywords',
+        config_parameter='hr_custody.category_keywords',
+        help='JSON object mapping keywords to category names, used to '
+             'auto-categorize properties'
+    )
+
+    @api.constrains('custody_category_keywords')
+    def _check_custody_category_keywords(self):
+        """Category keywords must be a JSON object"""
+        for settings in self:
+            if settings.custody_category_keywords and not isinstance(
+                    self._parse_category_keywords(settings.custody_category_keywords), dict):
+                raise ValidationError(_('Category keywords must be a JSON object, '
+                                        'e.g. {"laptop": "IT Equipment"}.'))
+
+    @api.model
+    def _parse_category_keywords(self, value):
+        """Parse the JSON category keywords, None when invalid"""
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    @api.model
+    @tools.ormcache()
+    def _get_custody_settings(self):
+        """Typed custody settings, read and parsed once per registry"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            reminder_days = int(ICP.get_param(
+                'hr_custody.maintenance_reminder_days', DEFAULT_MAINTENANCE_REMINDER_DAYS))
+        except (ValueError, TypeError):
+            reminder_days = DEFAULT_MAINTENANCE_REMINDER_DAYS
+
+        category_keywords = ICP.get_param('hr_custody.category_keywords')
+        category_keywords = category_keywords and self._parse_category_keywords(category_keywords)
+        if not isinstance(category_keywords, dict):
+            category_keywords = DEFAULT_CATEGORY_KEYWORDS
+
+        return frozendict({
+            'maintenance_reminder_days': reminder_days,
+            'reminder_digest': str2bool(ICP.get_param('hr_custody.reminder_digest', 'False')),
+            'category_keywords': frozendict(category_keywords),
+        })
@@ -1 +1,4 @@
+from . import materialized_view
 from . import report_custody
+from . import maintenance_forecast
+from . import report_maintenance_cost
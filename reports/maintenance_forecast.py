@@ -0,0 +1,75 @@
+import logging
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Number of days projected by the maintenance forecast
+FORECAST_HORIZON_DAYS = 365
+
+
+class CustodyMaintenanceForecast(models.Model):
+    """Upcoming maintenance workload of the fleet.
+
+    Rows are regenerated from the recurrence rules of the properties by the
+    'Property: Refresh Maintenance Forecast' cron, so calendar and pivot
+    views per responsible person and month read a plain table.
+    """
+    _name = 'custody.maintenance.forecast'
+    _description = 'Maintenance Forecast'
+    _order = 'maintenance_date, id'
+    _rec_name = 'property_id'
+
+    property_id = fields.Many2one('custody.property', string='Property',
+                                  required=True, index=True, ondelete='cascade',
+                                  help='Property to maintain')
+    maintenance_date = fields.Date(string='Maintenance Date', index=True,
+                                   help='Forecasted maintenance date')
+    overdue = fields.Boolean(string='Overdue',
+                             help='The scheduled maintenance is already past '
+                                  'and still to be done')
+    responsible_person_id = fields.Many2one('hr.employee',
+                                            string='Responsible Person',
+                                            help='Person responsible for the '
+                                                 'maintenance')
+    department_id = fields.Many2one('hr.department',
+                                    string='Responsible Department',
+                                    help='Department responsible for the '
+                                         'property')
+    category_id = fields.Many2one('custody.category', string='Category',
+                                  help='Category of the property')
+    company_id = fields.Many2one('res.company', string='Company',
+                                 help='The company associated with this record.')
+    nbr = fields.Integer(string='# Maintenances', aggregator='sum',
+                         help='Number of maintenance occurrences')
+
+    @api.model
+    def _refresh_forecast(self, horizon_days=FORECAST_HORIZON_DAYS):
+        """Replace the forecast with the occurrences of the next ``horizon_days``"""
+        if np is None:
+            _logger.warning("Skipping the maintenance forecast: the numpy Python library is not installed.")
+            return True
+        today = fields.Date.today()
+        property_ids, dates, overdue = self.env['custody.property'].sudo()._get_maintenance_forecast(
+            today, today + timedelta(days=horizon_days))
+
+        self.env.flush_all()
+        self._cr.execute("DELETE FROM custody_maintenance_forecast")
+        self._cr.execute("""
+            INSERT INTO custody_maintenance_forecast
+                   (property_id, maintenance_date, overdue, responsible_person_id,
+                    department_id, category_id, company_id, nbr)
+            SELECT p.id, f.maintenance_date, f.overdue, p.responsible_person,
+                   p.department_id, p.category_id, p.company_id, 1
+              FROM unnest(%s::int[], %s::date[], %s::bool[])
+                   AS f(property_id, maintenance_date, overdue)
+              JOIN custody_property p ON p.id = f.property_id
+        """, (property_ids.tolist(), dates.tolist(), overdue.tolist()))
+        self.invalidate_model()
+        return True
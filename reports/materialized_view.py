@@ -0,0 +1,53 @@
+from odoo import api, models, tools
+
+
+class CustodyMaterializedView(models.AbstractModel):
+    """Report backed by a PostgreSQL materialized view.
+
+    Reports inheriting it implement :meth:`_query`. The view is recreated on
+    module update with the unique index on ``id`` required by
+    REFRESH MATERIALIZED VIEW CONCURRENTLY, plus one index per column of
+    ``_materialized_view_indexes``, and refreshed by
+    :meth:`_refresh_materialized_view`.
+    """
+    _name = 'custody.materialized.view.mixin'
+    _description = 'Materialized View Report'
+    _auto = False
+
+    # Columns indexed in addition to the unique id
+    _materialized_view_indexes = []
+
+    def _query(self):
+        """SELECT statement the materialized view is built from"""
+        raise NotImplementedError()
+
+    def init(self):
+        """Create the materialized view, replacing a previous view or
+        materialized view of the same name"""
+        if self._abstract:
+            return
+        self._cr.execute("SELECT relkind FROM pg_class WHERE relname = %s",
+                         (self._table,))
+        relation = self._cr.fetchone()
+        if relation and relation[0] == 'm':
+            self._cr.execute(
+                "DROP MATERIALIZED VIEW IF EXISTS %s CASCADE" % self._table)
+        else:
+            tools.sql.drop_view_if_exists(self._cr, self._table)
+        self._cr.execute("CREATE MATERIALIZED VIEW %s as %s" % (
+            self._table, self._query()))
+        # Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+        self._cr.execute("CREATE UNIQUE INDEX %s_id_index ON %s (id)" % (
+            self._table, self._table))
+        for column in self._materialized_view_indexes:
+            self._cr.execute("CREATE INDEX %s_%s_index ON %s (%s)" % (
+                self._table, column, self._table, column))
+
+    @api.model
+    def _refresh_materialized_view(self):
+        """Refresh the precomputed rows without blocking readers"""
+        self.env.flush_all()
+        self._cr.execute(
+            "REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_model()
+        return True
@@ -1,8 +1,15 @@
-from odoo import fields, models, tools
+from odoo import fields, models
 
 
 class ReportCustody(models.Model):
+    """Custody analysis backed by a materialized view.
+
+    Every measure is computed once per custody when the view is refreshed by
+    the 'Custody: Refresh Analysis' cron, so pivot and graph views read
+    precomputed rows instead of aggregating ``hr_custody`` live.
+    """
     _name = "report.custody"
+    _inherit = "custody.materialized.view.mixin"
     _description = "Custody Analysis"
     _auto = False
     _order = 'name desc'
@@ -11,15 +18,23 @@ class ReportCustody(models.Model):
                        help='A unique code associated with the custody report')
     date_request = fields.Date(string='Requested Date',
                                help='Choose the Request date')
+    request_month = fields.Date(string='Request Month',
+                                help='First day of the month of the request')
     employee_id = fields.Many2one('hr.employee', string='Select Employee',
                                   help='Select the employee associated '
                                        'with this record.')
+    department_id = fields.Many2one('hr.department', string='Department',
+                                    help='Department of the employee')
     purpose = fields.Char(string='Reason',
                           help='Enter the reason for this record')
     custody_property_id = fields.Many2one('custody.property',
                                           help='Select the property associated'
                                                ' with this record.',
                                           string='Property Name')
+    category_id = fields.Many2one('custody.category', string='Category',
+                                  help='Category of the property')
+    company_id = fields.Many2one('res.company', string='Company',
+                                 help='The company associated with this record.')
 
     # ⭐ NEW: Approved By field
     approved_by_id = fields.Many2one('res.users', string='Approved By',
@@ -42,54 +57,71 @@ class ReportCustody(models.Model):
          ('returned', 'Returned'), ('rejected', 'Refused')], string='Status',
         help='The current status of the record')
 
+    # Precomputed measures
+    nbr = fields.Integer(string='# Custodies', aggregator='sum',
+                         help='Number of custody requests')
+    duration_days = fields.Float(string='Custody Duration (Days)',
+                                 aggregator='avg',
+                                 help='Days between approval and return, or '
+                                      'until the last refresh if not returned')
+    approval_days = fields.Float(string='Time to Approve (Days)',
+                                 aggregator='avg',
+                                 help='Days between the request and its '
+                                      'approval')
+    overdue_days = fields.Integer(string='Overdue Days', aggregator='sum',
+                                  help='Days past the fixed return date')
+    renewal_count = fields.Integer(string='Renewals', aggregator='sum',
+                                   help='Number of approved renewals')
+
     def _select(self):
         """the function used to construct the
         SELECT statement for retrieving specific fields in a SQL query."""
         select_str = """
              SELECT
-                    (select 1 ) AS nbr,
                     t.id as id,
+                    1 as nbr,
                     t.name as name,
                     t.date_request as date_request,
-                    t.employee_id as employee,
+                    date_trunc('month', t.date_request)::date as request_month,
+                    t.employee_id as employee_id,
+                    e.department_id as department_id,
                     t.purpose as purpose,
-                    t.custody_property_id as custody_name,
+                    t.custody_property_id as custody_property_id,
+                    p.category_id as category_id,
+                    t.company_id as company_id,
                     t.approved_by_id as approved_by_id,
                     t.approved_date as approved_date,
                     t.return_date as return_date,
                     t.renew_date as renew_date,
-                    t.is_renew_return_date as renew_return_date,
-                    t.state as state
+                    t.is_renew_return_date as is_renew_return_date,
+                    t.state as state,
+                    COALESCE(t.renewal_count, 0) as renewal_count,
+                    CASE WHEN t.approved_date IS NOT NULL THEN
+                        EXTRACT(EPOCH FROM COALESCE(t.returned_date, now() AT TIME ZONE 'UTC')
+                                           - t.approved_date) / 86400.0
+                    END as duration_days,
+                    CASE WHEN t.approved_date IS NOT NULL THEN
+                        EXTRACT(EPOCH FROM t.approved_date - t.create_date) / 86400.0
+                    END as approval_days,
+                    CASE
+                        WHEN t.state = 'returned' THEN COALESCE(t.return_delay_days, 0)
+                        WHEN t.state = 'approved' AND t.return_type = 'date'
+                             AND t.return_date IS NOT NULL
+                            THEN GREATEST(CURRENT_DATE - t.return_date, 0)
+                        ELSE 0
+                    END as overdue_days
         """
         return select_str
 
-    def _group_by(self):
-        """The function used to construct
-        the GROUP BY clause for grouping fields in a SQL query."""
-        group_by_str = """
-                GROUP BY
-                    t.id,
-                    name,
-                    date_request,
-                    employee_id,
-                    purpose,
-                    custody_property_id,
-                    approved_by_id,
-                    approved_date,
-                    return_date,
-                    renew_date,
-                    is_renew_return_date,
-                    state
+    def _from(self):
+        """The function used to construct the FROM clause of the SQL query."""
+        from_str = """
+                FROM hr_custody t
+                    LEFT JOIN hr_employee e ON e.id = t.employee_id
+                    LEFT JOIN custody_property p ON p.id = t.custody_property_id
         """
-        return group_by_str
+        return from_str
 
-    def init(self):
-        """The function used to initialize the
-        database view 'report_custody' for reporting purposes."""
-        tools.sql.drop_view_if_exists(self._cr, 'report_custody')
-        self._cr.execute("""
-            CREATE view report_custody as
-              %s
-              FROM hr_custody t
-                %s
-        """ % (self._select(), self._group_by()))
+    def _query(self):
+        """The SELECT statement the materialized view is built from."""
+        return "%s %s" % (self._select(), self._from())
@@ -0,0 +1,113 @@
+from odoo import fields, models
+
+
+class ReportMaintenanceCost(models.Model):
+    """Maintenance cost and total cost of ownership analysis.
+
+    One row per maintenance plus one acquisition row per property carrying
+    its purchase value, so summing ``total_cost`` by property, category,
+    vendor or year gives the total cost of ownership. Failure intervals are
+    computed with a window function when the materialized view is refreshed
+    by the 'Property: Refresh Maintenance Cost Analysis' cron.
+    """
+    _name = "report.custody.maintenance.cost"
+    _inherit = "custody.materialized.view.mixin"
+    _description = "Maintenance Cost Analysis"
+    _auto = False
+    _materialized_view_indexes = ['date']
+    _order = 'date desc'
+
+    line_type = fields.Selection(
+        [('purchase', 'Purchase'), ('maintenance', 'Maintenance')],
+        string='Cost Type', help='Acquisition or maintenance cost')
+    date = fields.Date(string='Date',
+                       help='Maintenance date, or purchase date of the property')
+    property_id = fields.Many2one('custody.property', string='Property',
+                                  help='Property the cost belongs to')
+    category_id = fields.Many2one('custody.category', string='Category',
+                                  help='Category of the property')
+    department_id = fields.Many2one('hr.department',
+                                    string='Responsible Department',
+                                    help='Department responsible for the property')
+    company_id = fields.Many2one('res.company', string='Company',
+                                 help='The company associated with this record.')
+    vendor_id = fields.Many2one('res.partner', string='External Vendor',
+                                help='External vendor who performed the maintenance')
+    maintenance_type = fields.Selection([
+        ('preventive', 'Preventive Maintenance'),
+        ('corrective', 'Corrective Maintenance'),
+        ('emergency', 'Emergency Repair')
+    ], string='Maintenance Type', help='Type of the maintenance')
+
+    # Precomputed measures
+    purchase_cost = fields.Float(string='Purchase Cost', aggregator='sum',
+                                 help='Purchase value of the property')
+    maintenance_cost = fields.Float(string='Maintenance Cost', aggregator='sum',
+                                    help='Cost of the maintenance')
+    total_cost = fields.Float(string='Total Cost of Ownership', aggregator='sum',
+                              help='Purchase and maintenance costs')
+    nbr_maintenance = fields.Integer(string='# Maintenances', aggregator='sum',
+                                     help='Number of maintenances')
+    nbr_failures = fields.Integer(string='# Failures', aggregator='sum',
+                                  help='Number of corrective and emergency '
+                                       'maintenances')
+    failure_interval_days = fields.Float(
+        string='MTBF (Days)', aggregator='avg',
+        help='Days since the previous corrective or emergency maintenance of '
+             'the same property; its average is the mean time between failures')
+
+    def _select(self):
+        """Construct the SELECT statements of the maintenance and purchase rows"""
+        select_str = """
+            WITH failures AS (
+                SELECT h.id as id,
+                       h.maintenance_date - LAG(h.maintenance_date) OVER (
+                           PARTITION BY h.property_id
+                           ORDER BY h.maintenance_date, h.id) as interval_days
+                  FROM custody_maintenance_history h
+                 WHERE h.maintenance_type IN ('corrective', 'emergency')
+            )
+            SELECT
+                    h.id as id,
+                    'maintenance' as line_type,
+                    h.maintenance_date as date,
+                    h.property_id as property_id,
+                    p.category_id as category_id,
+                    p.department_id as department_id,
+                    p.company_id as company_id,
+                    h.vendor_id as vendor_id,
+                    h.maintenance_type as maintenance_type,
+                    0.0 as purchase_cost,
+                    COALESCE(h.cost, 0.0) as maintenance_cost,
+                    COALESCE(h.cost, 0.0) as total_cost,
+                    1 as nbr_maintenance,
+                    CASE WHEN f.id IS NOT NULL THEN 1 ELSE 0 END as nbr_failures,
+                    f.interval_days as failure_interval_days
+              FROM custody_maintenance_history h
+                   JOIN custody_property p ON p.id = h.property_id
+                   LEFT JOIN failures f ON f.id = h.id
+            UNION ALL
+            SELECT
+                    -p.id as id,
+                    'purchase' as line_type,
+                    COALESCE(p.purchase_date, p.create_date::date) as date,
+                    p.id as property_id,
+                    p.category_id as category_id,
+                    p.department_id as department_id,
+                    p.company_id as company_id,
+                    NULL as vendor_id,
+                    NULL as maintenance_type,
+                    p.purchase_value as purchase_cost,
+                    0.0 as maintenance_cost,
+                    p.purchase_value as total_cost,
+                    0 as nbr_maintenance,
+                    0 as nbr_failures,
+                    NULL as failure_interval_days
+              FROM custody_property p
+             WHERE COALESCE(p.purchase_value, 0.0) != 0.0
+        """
+        return select_str
+
+    def _query(self):
+        """The SELECT statement the materialized view is built from"""
+        return self._select()
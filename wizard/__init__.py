@@ -24,3 +24,5 @@ from . import property_return_reason
 from . import property_return_date
 from . import multi_images_upload
 from . import record_maintenance
+from . import bulk_maintenance
+from . import compute_audit
@@ -0,0 +1,238 @@
+import base64
+import binascii
+import csv
+import io
+from collections import defaultdict
+
+from markupsafe import Markup, escape
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import frozendict
+
+# Columns of the vendor service CSV; only 'property' is required
+CSV_COLUMNS = ('property', 'date', 'type', 'cost', 'notes')
+
+
+class BulkMaintenanceWizard(models.TransientModel):
+    _name = 'custody.bulk.maintenance.wizard'
+    _description = 'Record Maintenance for Multiple Properties'
+
+    property_ids = fields.Many2many(
+        'custody.property',
+        string='Properties',
+        default=lambda self: self._default_property_ids(),
+        help='Properties serviced with the values below'
+    )
+
+    csv_file = fields.Binary(
+        string='Vendor Service File',
+        help='CSV file with the columns property (serial number or name), '
+             'date, type, cost and notes; missing values are taken from '
+             'this form'
+    )
+
+    csv_filename = fields.Char(string='File Name')
+
+    maintenance_date = fields.Date(
+        string='Maintenance Date',
+        required=True,
+        default=fields.Date.today
+    )
+
+    maintenance_type = fields.Selection([
+        ('preventive', 'Preventive Maintenance'),
+        ('corrective', 'Corrective Maintenance'),
+        ('emergency', 'Emergency Repair')
+    ], string='Maintenance Type', required=True, default='preventive')
+
+    performed_by = fields.Many2one(
+        'hr.employee',
+        string='Performed By',
+        help='Person who performed the maintenance'
+    )
+
+    vendor_id = fields.Many2one(
+        'res.partner',
+        string='Vendor',
+        domain=[('supplier_rank', '>', 0)],
+        help='External vendor who performed the maintenance'
+    )
+
+    cost = fields.Float(
+        string='Cost per Property',
+        help='Cost of maintenance for each property'
+    )
+
+    notes = fields.Text(
+        string='Notes',
+        help='Notes about the maintenance performed'
+    )
+
+    update_status = fields.Boolean(
+        string='Update Property Status',
+        default=True,
+        help='Update property status to Available'
+    )
+
+    preserve_in_use_status = fields.Boolean(
+        string='Preserve "In Use" Status',
+        default=True,
+        help='If checked and property was in use, it will remain in use after maintenance'
+    )
+
+    @api.model
+    def _default_property_ids(self):
+        """Preselect the properties the wizard was opened from"""
+        if self.env.context.get('active_model') == 'custody.property':
+            return [(6, 0, self.env.context.get('active_ids', []))]
+        return False
+
+    def _get_form_lines(self):
+        """One maintenance line per selected property"""
+        return [{
+            'property': prop,
+            'maintenance_date': self.maintenance_date,
+            'maintenance_type': self.maintenance_type,
+            'cost': self.cost,
+            'notes': self.notes,
+        } for prop in self.property_ids]
+
+    def _get_csv_lines(self):
+        """Parse the vendor service file into maintenance lines.
+
+        Properties are matched on their serial number or their name; a value
+        matching several properties is reported as ambiguous. All rows are
+        checked before anything is recorded.
+        """
+        try:
+            content = base64.b64decode(self.csv_file).decode('utf-8-sig')
+            reader = csv.DictReader(io.StringIO(content))
+            reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames or []]
+            rows = list(reader)
+        except (UnicodeDecodeError, binascii.Error, csv.Error) as e:
+            raise UserError(_('The vendor service file could not be read: it must be a '
+                              'comma-separated CSV file encoded in UTF-8 (%s).') % e) from e
+        if 'property' not in reader.fieldnames:
+            raise UserError(_('The file must have a "property" column. '
+                              'Supported columns: %s') % ', '.join(CSV_COLUMNS))
+
+        keys = {(row.get('property') or '').strip() for row in rows} - {''}
+        properties = self.env['custody.property'].search([
+            '|', ('serial_number', 'in', list(keys)), ('name', 'in', list(keys)),
+        ])
+        by_key = defaultdict(lambda: self.env['custody.property'])
+        for prop in properties:
+            by_key[prop.name] |= prop
+            if prop.serial_number:
+                by_key[prop.serial_number] |= prop
+
+        types = dict(self._fields['maintenance_type'].selection)
+        lines, errors = [], []
+        for line_number, row in enumerate(rows, start=2):
+            key = (row.get('property') or '').strip()
+            if not key:
+                continue
+            prop = by_key.get(key)
+            maintenance_type = (row.get('type') or '').strip().lower() or self.maintenance_type
+            try:
+                maintenance_date = fields.Date.to_date((row.get('date') or '').strip() or self.maintenance_date)
+                cost = float((row.get('cost') or '').strip() or self.cost)
+            except ValueError:
+                errors.append(_('Line %s: invalid date or cost') % line_number)
+                continue
+            if not prop:
+                errors.append(_('Line %s: unknown property "%s"') % (line_number, key))
+            elif len(prop) > 1:
+                errors.append(_('Line %s: "%s" matches several properties (%s), use a unique serial number')
+                              % (line_number, key, ', '.join(prop.mapped('display_name'))))
+            elif maintenance_type not in types:
+                errors.append(_('Line %s: unknown maintenance type "%s"') % (line_number, maintenance_type))
+            else:
+                lines.append({
+                    'property': prop,
+                    'maintenance_date': maintenance_date,
+                    'maintenance_type': maintenance_type,
+                    'cost': cost,
+                    'notes': (row.get('notes') or '').strip() or self.notes,
+                })
+        if errors:
+            raise UserError('\n'.join(errors))
+        return lines
+
+    def action_record_maintenance(self):
+        """Record the maintenance of every line and update the properties.
+
+        History rows are created in one call, properties are written once per
+        distinct set of values and chatter notes are logged in one batch.
+        """
+        self.ensure_one()
+        lines = self._get_csv_lines() if self.csv_file else self._get_form_lines()
+        if not lines:
+            raise UserError(_('Select at least one property or upload a vendor service file.'))
+
+        for line in lines:
+            prop = line['property']
+            line['next_maintenance_date'] = prop._get_next_maintenance_date(
+                line['maintenance_date'], prop.maintenance_frequency, prop.maintenance_interval)
+
+        self.env['custody.maintenance.history'].create([{
+            'property_id': line['property'].id,
+            'maintenance_date': line['maintenance_date'],
+            'maintenance_type': line['maintenance_type'],
+            'performed_by': self.performed_by.id,
+            'vendor_id': self.vendor_id.id,
+            'cost': line['cost'],
+            'notes': line['notes'],
+            'next_maintenance_date': line['next_maintenance_date'],
+        } for line in lines])
+
+        # The latest maintenance of each property drives its dates and status
+        latest = {}
+        for line in lines:
+            current = latest.get(line['property'])
+            if not current or line['maintenance_date'] >= current['maintenance_date']:
+                latest[line['property']] = line
+        to_write = defaultdict(lambda: self.env['custody.property'])
+        for prop, line in latest.items():
+            vals = {'last_maintenance_date': line['maintenance_date']}
+            # Keep a manually set date when the frequency gives none
+            if line['next_maintenance_date']:
+                vals['next_maintenance_date'] = line['next_maintenance_date']
+            if self.update_status:
+                if self.preserve_in_use_status and prop.property_status == 'in_use':
+                    vals['property_status'] = 'in_use'
+                else:
+                    vals['property_status'] = 'available'
+            to_write[frozendict(vals)] |= prop
+        for vals, properties in to_write.items():
+            properties.write(dict(vals))
+
+        types = dict(self._fields['maintenance_type'].selection)
+        performer = self.performed_by.name or self.vendor_id.name
+        notes = defaultdict(list)
+        for line in lines:
+            note = _('🔧 %(type)s recorded on %(date)s', type=types[line['maintenance_type']],
+                     date=fields.Date.to_string(line['maintenance_date']))
+            if performer:
+                note += _(' by %s') % performer
+            if line['cost']:
+                note += _(' (cost %s)') % f"{line['cost']:,.2f}"
+            notes[line['property']].append(escape(note))
+        properties = self.env['custody.property'].concat(*notes)
+        properties._message_log_batch(bodies={
+            prop.id: Markup('<br/>').join(prop_notes) for prop, prop_notes in notes.items()
+        })
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Maintenance Recorded'),
+                'message': _('%(count)s maintenance records created for %(properties)s properties.',
+                             count=len(lines), properties=len(properties)),
+                'sticky': False,
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            }
+        }
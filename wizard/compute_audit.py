@@ -0,0 +1,127 @@
+import logging
+
+from markupsafe import Markup, escape
+
+from odoo import api, fields, models, _
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Models whose stored computed fields are audited
+AUDITED_MODELS = ('custody.property', 'hr.custody', 'custody.maintenance.history')
+AUDIT_BATCH_SIZE = 1000
+# Record ids listed per drifting field in the report
+AUDIT_SAMPLE_SIZE = 10
+
+
+class AuditRollback(Exception):
+    """Raised to roll back the recomputation of an audit-only batch"""
+
+
+class CustodyComputeAudit(models.TransientModel):
+    _name = 'custody.compute.audit'
+    _description = 'Stored Compute Audit'
+
+    target_model = fields.Selection([
+        ('all', 'All Custody Models'),
+        ('custody.property', 'Properties'),
+        ('hr.custody', 'Custody Requests'),
+        ('custody.maintenance.history', 'Maintenance History'),
+    ], string='Model', required=True, default='all')
+
+    repair = fields.Boolean(
+        string='Repair Drift',
+        help='Keep the recomputed values instead of only reporting the drift'
+    )
+
+    batch_size = fields.Integer(
+        string='Batch Size',
+        default=AUDIT_BATCH_SIZE,
+        help='Records recomputed at once; bounds the memory used by the audit'
+    )
+
+    result = fields.Html(string='Result', readonly=True, sanitize=False)
+
+    @api.model
+    def _audit_value(self, field, value):
+        """Comparable form of a field value"""
+        if field.relational:
+            return tuple(sorted(value.ids))
+        return value
+
+    @api.model
+    def _audit_stored_computes(self, model_names=AUDITED_MODELS, repair=False,
+                               batch_size=AUDIT_BATCH_SIZE):
+        """Recompute every stored computed field of ``model_names`` and diff
+        the results against the stored values.
+
+        Records are processed in batches of ``batch_size`` inside a savepoint,
+        rolled back unless ``repair`` is set, and the cache is cleared after
+        each batch so memory does not grow with the table.
+
+        :return: ``{(model, field): [drifting record ids]}``
+        """
+        drift = {}
+        for model_name in model_names:
+            model = self.env[model_name].with_context(active_test=False)
+            audited = [field for field in model._fields.values() if field.store and field.compute]
+            fnames = [field.name for field in audited]
+            for ids in split_every(batch_size, model.search([], order='id').ids):
+                records = model.browse(ids)
+                try:
+                    with self.env.cr.savepoint():
+                        stored = {
+                            (record.id, field.name): self._audit_value(field, record[field.name])
+                            for record in records for field in audited
+                        }
+                        for field in audited:
+                            self.env.add_to_compute(field, records)
+                        records.flush_recordset(fnames)
+                        for record in records:
+                            for field in audited:
+                                value = self._audit_value(field, record[field.name])
+                                if value != stored[record.id, field.name]:
+                                    drift.setdefault((model_name, field.name), []).append(record.id)
+                        if not repair:
+                            raise AuditRollback()
+                except AuditRollback:
+                    pass
+                self.env.invalidate_all()
+
+        for (model_name, fname), record_ids in drift.items():
+            _logger.info("Stored compute drift on %s.%s: %s records%s", model_name, fname,
+                         len(record_ids), " repaired" if repair else "")
+        return drift
+
+    def action_run_audit(self):
+        """Run the audit and show the drift per field"""
+        self.ensure_one()
+        model_names = AUDITED_MODELS if self.target_model == 'all' else (self.target_model,)
+        drift = self._audit_stored_computes(
+            model_names, repair=self.repair, batch_size=max(self.batch_size, 1))
+
+        if drift:
+            rows = Markup().join(
+                Markup('<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>') % (
+                    model_name, fname, len(record_ids),
+                    ', '.join(map(str, record_ids[:AUDIT_SAMPLE_SIZE])))
+                for (model_name, fname), record_ids in sorted(drift.items())
+            )
+            self.result = Markup(
+                '<p>%s</p><table class="table table-sm"><thead><tr>'
+                '<th>%s</th><th>%s</th><th>%s</th><th>%s</th>'
+                '</tr></thead><tbody>%s</tbody></table>'
+            ) % (
+                _('Stale values were repaired.') if self.repair else _('Stale values found; nothing was changed.'),
+                _('Model'), _('Field'), _('Records'), _('Sample Ids'), rows,
+            )
+        else:
+            self.result = Markup('<p>%s</p>') % escape(_('All stored computed fields are up to date.'))
+
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
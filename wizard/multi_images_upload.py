@@ -1,9 +1,20 @@
 from odoo import api, fields, models, _
 import base64
 import logging
+import multiprocessing
+from datetime import timedelta
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, wait
+
+from odoo.tools import config
+
+from ..models.custody_image import compute_checksum, process_image_data
 
 _logger = logging.getLogger(__name__)
 
+# Default cap on the processes forked per upload, overridden by the
+# hr_custody.upload_pool_workers system parameter
+UPLOAD_POOL_MAX_WORKERS = 2
+
 class MultiImagesUpload(models.TransientModel):
     _name = 'custody.multi.images.upload'
     _description = 'Upload Multiple Images'
@@ -44,39 +55,146 @@ class MultiImagesUpload(models.TransientModel):
         help='Select multiple image files to upload'
     )
     
+    @api.autovacuum
+    def _gc_uploaded_attachments(self):
+        """Delete the files uploaded to wizards that were never submitted"""
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=1)),
+        ]).unlink()
+
+    @api.model
+    def _get_processed(self, process, *args):
+        """Result of ``process(*args)``, or None when the image can't be processed"""
+        try:
+            return process(*args)
+        except Exception as e:
+            _logger.error("Failed to process image: %s", e)
+            return None
+
+    @api.model
+    def _get_pool_size(self, count):
+        """Number of processes to spread ``count`` uploads over.
+
+        A pool is only forked from the single-threaded workers of a
+        multi-process server: forking the threaded server could deadlock
+        the children on locks held by other threads. The pool is capped by
+        the hr_custody.upload_pool_workers system parameter so concurrent
+        uploads stay within the server's worker sizing.
+        """
+        if not config['workers']:
+            return 1
+        try:
+            limit = int(self.env['ir.config_parameter'].sudo().get_param(
+                'hr_custody.upload_pool_workers', UPLOAD_POOL_MAX_WORKERS))
+        except (ValueError, TypeError):
+            limit = UPLOAD_POOL_MAX_WORKERS
+        return max(min(count, limit), 1)
+
+    def _process_sources(self, sources):
+        """Run ``process_image_data`` over ``sources``, on a process pool
+        when :meth:`_get_pool_size` allows it.
+
+        A file that fails to decode yields ``None``. If the pool itself
+        breaks, the batch is processed serially instead.
+        """
+        workers = self._get_pool_size(len(sources))
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context('fork')) as pool:
+                    futures = [pool.submit(process_image_data, source) for source in sources]
+                    wait(futures)
+                    # A dead worker fails every pending future, not only the
+                    # file it was processing: redo the whole batch serially
+                    if any(isinstance(future.exception(), BrokenExecutor) for future in futures):
+                        raise BrokenExecutor("An image worker process died")
+                    return [self._get_processed(future.result) for future in futures]
+            except (OSError, BrokenExecutor) as e:
+                _logger.warning("Image process pool unavailable, processing serially: %s", e)
+        return [self._get_processed(process_image_data, source) for source in sources]
+
     def action_upload_images(self):
-        """Process selected files and create custody.image records"""
+        """Process the selected files in parallel and create all
+        custody.image records with a single create.
+
+        Files are checksummed first so exact copies of an image already
+        stored for the custody and image type, or repeated within the
+        selection, are skipped before any decoding or resizing. Files that
+        can't be decoded as images are skipped too. When an upload needs no
+        resizing, its attachment is re-parented to the new image instead of
+        being decoded and written again. The other uploaded attachments are
+        deleted once the images exist.
+        """
         self.ensure_one()
-        
         CustodyImage = self.env['custody.image']
-        images_created = 0
-        
-        for i, attachment in enumerate(self.file_ids):
-            try:
-                # Skip non-image files
-                mimetype = attachment.mimetype or ''
-                if not mimetype.startswith('image/'):
-                    continue
-                
-                # Create image title
-                image_number = i + 1
-                name = f"{self.name} {image_number}" if len(self.file_ids) > 1 else self.name
-                
-                # Create custody image
-                CustodyImage.create({
-                    'name': name,
-                    'image': attachment.datas,
-                    'custody_id': self.custody_id.id,
-                    'image_type': self.image_type,
-                    'notes': self.notes,
-                })
-                images_created += 1
-                
-            except Exception as e:
-                _logger.error("Failed to process image: %s", e)
+
+        # Skip non-image files
+        attachments = self.file_ids.filtered(lambda a: (a.mimetype or '').startswith('image/'))
+        uploads = []
+        for attachment in attachments:
+            source = attachment.raw
+            uploads.append((attachment, source, {
+                'custody_id': self.custody_id.id,
+                'image_type': self.image_type,
+                'checksum': compute_checksum(source),
+            }))
+
+        # Drop exact duplicates, near-duplicates are linked by create
+        seen = set()
+        kept = []
+        for upload, exact in zip(uploads, CustodyImage._find_exact_duplicates([u[2] for u in uploads])):
+            checksum = upload[2]['checksum']
+            if not exact and checksum not in seen:
+                kept.append(upload)
+            seen.add(checksum)
+        duplicates_skipped = len(uploads) - len(kept)
+
+        results = self._process_sources([source for __, source, __ in kept])
+        # Files that can't be decoded are not stored as images
+        processed_uploads = [(upload, processed) for upload, processed in zip(kept, results) if processed]
+        invalid_skipped = len(kept) - len(processed_uploads)
+
+        vals_list = []
+        reused = []
+        for i, ((attachment, __, key), (processed_images, perceptual_hash)) in enumerate(processed_uploads):
+            # Create image title
+            image_number = i + 1
+            name = f"{self.name} {image_number}" if len(self.file_ids) > 1 else self.name
+
+            vals = {
+                'name': name,
+                'custody_id': self.custody_id.id,
+                'image_type': self.image_type,
+                'notes': self.notes,
+                'checksum': key['checksum'],
+                'perceptual_hash': perceptual_hash,
+                'processing_state': 'done',
+            }
+            vals.update({fname: base64.b64encode(data) for fname, data in processed_images.items()})
+            if 'image' not in vals:
+                # Upload needing no resizing: keep its attachment
+                reused.append((i, attachment))
+            vals_list.append(vals)
+        images = CustodyImage.create(vals_list)
+
+        for index, attachment in reused:
+            image = images[index]
+            attachment.write({
+                'name': 'image',
+                'res_model': image._name,
+                'res_field': 'image',
+                'res_id': image.id,
+            })
+        self.file_ids.filtered(lambda a: a.res_model != 'custody.image').unlink()
+        images_created = len(images)
         
         # Show success message
-        message = _(f"{images_created} images successfully uploaded")
+        message = _("%s images successfully uploaded") % images_created
+        if duplicates_skipped:
+            message += " " + _("(%s duplicates skipped)") % duplicates_skipped
+        if invalid_skipped:
+            message += " " + _("(%s unreadable files skipped)") % invalid_skipped
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
@@ -88,4 +206,4 @@ class MultiImagesUpload(models.TransientModel):
                     'type': 'ir.actions.act_window_close'
                 }
             }
-        } 
\ No newline at end of file
+        }
@@ -114,10 +114,9 @@ class PropertyReturnDate(models.TransientModel):
             raise UserError(_('Only approved custody records can be renewed'))
 
         # Update custody record
-        custody_obj.write({
+        custody_obj._transition('renew_request', {
             'is_renew_return_date': True,
             'renew_date': self.returned_date,
-            'state': 'to_approve'
         })
 
         # Post message for tracking
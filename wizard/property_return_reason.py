@@ -55,8 +55,7 @@ class PropertyReturnReason(models.TransientModel):
 
         # Handle renewal rejection
         if 'renew' in context:
-            reject_obj.write({
-                'state': 'approved',
+            reject_obj._transition('renew_refuse', {
                 'is_renew_reject': True,
                 'renew_rejected_reason': self.reason
             })
@@ -73,8 +72,7 @@ class PropertyReturnReason(models.TransientModel):
                 reject_obj.action_refuse()
             else:
                 # Standard custody rejection
-                reject_obj.write({
-                    'state': 'rejected',
+                reject_obj._transition('reject', {
                     'rejected_reason': self.reason
                 })
                 # Post message for tracking
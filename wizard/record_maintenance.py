@@ -1,5 +1,4 @@
 from odoo import api, fields, models, _
-from datetime import timedelta
 
 
 class RecordMaintenanceWizard(models.TransientModel):
@@ -80,19 +79,12 @@ class RecordMaintenanceWizard(models.TransientModel):
             self.performed_by = self.property_id.responsible_person
             
             # Calculate next maintenance date based on frequency
-            if self.property_id.maintenance_frequency != 'none':
-                base_date = self.maintenance_date
-                
-                if self.property_id.maintenance_frequency == 'monthly':
-                    self.next_maintenance_date = base_date + timedelta(days=30)
-                elif self.property_id.maintenance_frequency == 'quarterly':
-                    self.next_maintenance_date = base_date + timedelta(days=90)
-                elif self.property_id.maintenance_frequency == 'biannual':
-                    self.next_maintenance_date = base_date + timedelta(days=182)
-                elif self.property_id.maintenance_frequency == 'annual':
-                    self.next_maintenance_date = base_date + timedelta(days=365)
-                elif self.property_id.maintenance_frequency == 'custom' and self.property_id.maintenance_interval > 0:
-                    self.next_maintenance_date = base_date + timedelta(days=self.property_id.maintenance_interval)
+            next_date = self.property_id._get_next_maintenance_date(
+                self.maintenance_date,
+                self.property_id.maintenance_frequency,
+                self.property_id.maintenance_interval)
+            if next_date:
+                self.next_maintenance_date = next_date
     
     def action_record_maintenance(self):
         """Record the maintenance and update the property"""